@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+SNAPSHOT_FIELDS = ('id', 'username', 'role', 'is_superuser', 'is_active')
+
+
+def snapshot_key(user_id):
+    return f'jwt-user:{user_id}'
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без запроса к таблице пользователей:
+    поля из SNAPSHOT_FIELDS кэшируются на JWT_USER_CACHE_TIMEOUT
+    секунд и сбрасываются при сохранении или удалении пользователя.
+
+    request.user — несохранённая копия с этими полями. Для остальных
+    полей пользователя его нужно загрузить из БД."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        snapshot = cache.get(snapshot_key(user_id))
+        if snapshot is not None:
+            user = self.user_model(**snapshot)
+            user._state.adding = False
+            return user
+        # Ищет пользователя и отклоняет неактивного.
+        user = super().get_user(validated_token)
+        cache.set(
+            snapshot_key(user_id),
+            {field: getattr(user, field) for field in SNAPSHOT_FIELDS},
+            settings.JWT_USER_CACHE_TIMEOUT
+        )
+        return user
@@ -0,0 +1,111 @@
+import re
+from bisect import bisect_left
+from threading import Lock
+
+from reviews.models import Title
+from .caching import get_versions
+
+
+def normalize(text):
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+def word_suffixes(name):
+    """Хвосты названия, начинающиеся с каждого слова: так «оре»
+    находит и «Орешек», и «Крепкий орешек»."""
+    normalized = normalize(name)
+    return [normalized[match.start():]
+            for match in re.finditer(r'(?<!\S)\S', normalized)]
+
+
+class TitlePrefixIndex:
+    """Отсортированный массив нормализованных названий произведений
+    для подсказок по префиксу без обращения к БД.
+
+    Строится при первом запросе и обновляется после фиксации
+    сохранения и удаления произведений в текущем процессе. Изменения
+    из других процессов видны по версии `Title` в общем кэше
+    (`api.caching`): если она не та, с которой согласован индекс,
+    индекс строится заново."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.keys = None
+        self.ids = []
+        self.names = {}
+        self.version = None
+
+    @staticmethod
+    def current_version():
+        return get_versions([Title])[0]
+
+    def reset(self):
+        with self.lock:
+            self.keys = None
+
+    def build(self):
+        # Версия читается до данных: изменение во время построения
+        # приведёт к ещё одной перестройке, а не к потере.
+        version = self.current_version()
+        entries = []
+        names = {}
+        for pk, name in Title.objects.values_list('pk', 'name').iterator():
+            names[pk] = name
+            entries.extend((key, pk) for key in word_suffixes(name))
+        entries.sort()
+        with self.lock:
+            self.keys = [key for key, _ in entries]
+            self.ids = [pk for _, pk in entries]
+            self.names = names
+            self.version = version
+
+    def _remove(self, pk):
+        name = self.names.pop(pk, None)
+        if name is None:
+            return
+        for key in word_suffixes(name):
+            position = bisect_left(self.keys, key)
+            while self.ids[position] != pk:
+                position += 1
+            del self.keys[position]
+            del self.ids[position]
+
+    def update(self, pk, name):
+        """Вызывается после фиксации сохранения, когда версия `Title`
+        уже сменилась: индекс принимает её как свою."""
+        with self.lock:
+            if self.keys is None:
+                return
+            self._remove(pk)
+            self.names[pk] = name
+            for key in word_suffixes(name):
+                position = bisect_left(self.keys, key)
+                self.keys.insert(position, key)
+                self.ids.insert(position, pk)
+            self.version = self.current_version()
+
+    def remove(self, pk):
+        with self.lock:
+            if self.keys is not None:
+                self._remove(pk)
+                self.version = self.current_version()
+
+    def complete(self, prefix, limit=10):
+        """До limit произведений (id, name), в названии которых есть
+        слово, начинающееся с prefix, в алфавитном порядке совпадений."""
+        if self.keys is None or self.current_version() != self.version:
+            self.build()
+        prefix = normalize(prefix)
+        found = {}
+        with self.lock:
+            position = bisect_left(self.keys, prefix)
+            while len(found) < limit and position < len(self.keys):
+                if not self.keys[position].startswith(prefix):
+                    break
+                pk = self.ids[position]
+                found.setdefault(pk, self.names[pk])
+                position += 1
+        return list(found.items())
+
+
+title_index = TitlePrefixIndex()
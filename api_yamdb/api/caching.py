@@ -0,0 +1,89 @@
+import hashlib
+import time
+from uuid import uuid4
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.sql import Query
+from django.db.models.sql.where import WhereNode
+
+
+def version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+
+def new_version():
+    """Версия начинается со времени изменения, чтобы по ней
+    можно было отдавать Last-Modified."""
+    return f'{time.time():.6f}-{uuid4().hex}'
+
+
+def invalidate(model):
+    """Делает устаревшими все записи кэша, построенные по данным модели.
+
+    Версия меняется сразу и ещё раз после фиксации транзакции: ответ,
+    прочитанный до COMMIT, попадёт в кэш под промежуточной версией
+    и больше не будет отдан."""
+    cache.set(version_key(model), new_version(), None)
+    transaction.on_commit(
+        lambda: cache.set(version_key(model), new_version(), None)
+    )
+
+
+def get_versions(models):
+    """Текущие версии моделей в порядке models."""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def last_modified(versions):
+    """Время последнего изменения по версиям моделей
+    с точностью до секунды, как в заголовке Last-Modified."""
+    return int(max(float(version.split('-')[0]) for version in versions))
+
+
+def subqueries(node):
+    """Подзапросы условия или выражения:
+    Exists, Subquery, `__in=<queryset>`."""
+    if isinstance(node, Query):
+        yield node
+    elif isinstance(node, WhereNode):
+        for child in node.children:
+            yield from subqueries(child)
+    elif hasattr(node, 'get_source_expressions'):
+        for expression in node.get_source_expressions():
+            yield from subqueries(expression)
+
+
+def query_tables(query):
+    """Таблицы запроса, его JOIN и подзапросов."""
+    tables = {join.table_name for join in query.alias_map.values()}
+    tables.add(query.get_meta().db_table)
+    for node in (query.where, *query.annotations.values()):
+        for subquery in subqueries(node):
+            tables |= query_tables(subquery)
+    return tables
+
+
+def query_models(queryset):
+    """Модели всех таблиц, участвующих в запросе
+    (включая JOIN и подзапросы фильтров)."""
+    tables = query_tables(queryset.query)
+    return sorted(
+        (model for model in apps.get_models(include_auto_created=True)
+         if model._meta.db_table in tables),
+        key=lambda model: model._meta.label_lower
+    )
+
+
+def make_key(prefix, versions, *parts):
+    digest = hashlib.md5(
+        ''.join(str(part) for part in (*versions, *parts)).encode()
+    ).hexdigest()
+    return f'{prefix}:{digest}'
@@ -1,12 +1,82 @@
-from django_filters.rest_framework import FilterSet, CharFilter
+from django.db.models import Exists, OuterRef
+from django.utils.dateparse import parse_datetime
+from django_filters.rest_framework import BaseInFilter, FilterSet, CharFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
 
-from reviews.models import Title
+from reviews.models import Category, Genre, Title
+
+
+class CharInFilter(BaseInFilter, CharFilter):
+    pass
 
 
 class TitleFilter(FilterSet):
-    genre = CharFilter(field_name='genre__slug', lookup_expr='contains')
-    category = CharFilter(field_name='category__slug', lookup_expr='contains')
+    """Жанр и категория ищутся по точному slug, несколько значений
+    перечисляются через запятую. Slug'и заранее переводятся в id,
+    чтобы фильтр шёл по индексу внешнего ключа.
+    Поиск подстроки (LIKE '%x%') — только через `*_contains`.
+    Жанры проверяются через EXISTS, а не JOIN, поэтому произведение
+    с несколькими подходящими жанрами не дублируется."""
+
+    genre = CharInFilter(method='filter_genre')
+    category = CharInFilter(method='filter_category')
+    genre_contains = CharFilter(method='filter_genre_contains')
+    category_contains = CharFilter(field_name='category__slug',
+                                   lookup_expr='contains')
 
     class Meta:
         model = Title
         fields = ('genre', 'year', 'name', 'category')
+
+    def filter_by_genres(self, queryset, **lookup):
+        return queryset.filter(Exists(Title.genre.through.objects.filter(
+            title_id=OuterRef('pk'), **lookup
+        )))
+
+    def filter_genre(self, queryset, name, value):
+        ids = Genre.objects.filter(slug__in=value).values_list('id', flat=True)
+        return self.filter_by_genres(queryset, genre_id__in=list(ids))
+
+    def filter_genre_contains(self, queryset, name, value):
+        return self.filter_by_genres(queryset, genre__slug__contains=value)
+
+    def filter_category(self, queryset, name, value):
+        ids = Category.objects.filter(slug__in=value).values_list(
+            'id', flat=True
+        )
+        return queryset.filter(category_id__in=list(ids))
+
+
+class ChangedSinceFilter(BaseFilterBackend):
+    """Фильтр `?changed_since=<ISO 8601>` по полю `changed_since_field`
+    представления (по умолчанию `updated_at`)."""
+
+    query_param = 'changed_since'
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.query_param)
+        if value is None:
+            return queryset
+        try:
+            changed_since = parse_datetime(value)
+        except ValueError:
+            changed_since = None
+        if changed_since is None:
+            raise ValidationError(
+                {self.query_param: 'Expected an ISO 8601 datetime'}
+            )
+        field = getattr(view, 'changed_since_field', 'updated_at')
+        return queryset.filter(**{f'{field}__gte': changed_since})
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск `?q=` по индексу `SearchDocument`."""
+
+    query_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.query_param, '').strip()
+        if not value:
+            raise ValidationError({self.query_param: 'This field is required'})
+        return queryset.search(value)
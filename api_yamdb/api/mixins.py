@@ -1,8 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, viewsets, filters
+from rest_framework.response import Response
 
+from .filters import ChangedSinceFilter
+from .caching import get_versions, last_modified, make_key
 from .permissions import IsAdmin, ReadOnly
 
 
+class ConditionalResponseMixin:
+    """Миксин условных GET-запросов (ETag, Last-Modified).
+    Валидаторы считаются по версиям моделей из `cache_models`
+    и пути запроса, без сериализации ответа.
+    С `cache_responses = True` сами ответы тоже кэшируются."""
+
+    cache_models = ()
+    cache_responses = False
+
+    def read_response(self, method, request, *args, **kwargs):
+        versions = get_versions(self.cache_models)
+        key = make_key('response', versions, request.path,
+                       sorted(request.query_params.lists()))
+        etag = quote_etag(key.split(':')[1])
+        modified = last_modified(versions) if versions else None
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=modified
+        )
+        if not_modified is not None:
+            response = not_modified
+        elif self.cache_responses:
+            response = self.cached_response(key, method, request, *args,
+                                            **kwargs)
+        else:
+            response = method(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if modified is not None:
+                response['Last-Modified'] = http_date(modified)
+        return response
+
+    def cached_response(self, key, method, request, *args, **kwargs):
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = method(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalListMixin(ConditionalResponseMixin):
+    def list(self, request, *args, **kwargs):
+        return self.read_response(super().list, request, *args, **kwargs)
+
+
+class ConditionalRetrieveMixin(ConditionalResponseMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.read_response(super().retrieve, request, *args,
+                                  **kwargs)
+
+
 class CreateListDestroyMixin(mixins.CreateModelMixin, mixins.ListModelMixin,
                              mixins.DestroyModelMixin,
                              viewsets.GenericViewSet):
@@ -12,6 +71,6 @@ class CreateListDestroyMixin(mixins.CreateModelMixin, mixins.ListModelMixin,
     С уровнем доступа 'Админ или только чтение'."""
 
     permission_classes = [IsAdmin | ReadOnly]
-    filter_backends = (filters.SearchFilter,)
+    filter_backends = (filters.SearchFilter, ChangedSinceFilter)
     search_fields = ('slug', 'name')
     lookup_field = 'slug'
@@ -0,0 +1,250 @@
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.pagination import (BasePagination, Cursor,
+                                       CursorPagination, PageNumberPagination)
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .caching import get_versions, make_key, query_models
+
+
+def estimate_count(queryset):
+    """Оценка числа строк планировщиком PostgreSQL без выполнения запроса."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return int(cursor.fetchone()[0][0]['Plan']['Plan Rows'])
+
+
+def count_queryset(queryset):
+    """Возвращает пару (количество, точное ли оно).
+    На PostgreSQL большие выборки не пересчитываются через COUNT(*),
+    а берутся из оценки планировщика."""
+    if connections[queryset.db].vendor == 'postgresql':
+        estimate = estimate_count(queryset)
+        if estimate > settings.EXACT_COUNT_LIMIT:
+            return estimate, False
+    return queryset.count(), True
+
+
+def get_count(queryset):
+    """Количество объектов выборки, закэшированное по SQL запроса.
+    Кэш сбрасывается при записи в любую таблицу запроса."""
+    try:
+        sql = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0, True
+    key = make_key('count', get_versions(query_models(queryset)), *sql)
+    result = cache.get(key)
+    if result is None:
+        result = count_queryset(queryset)
+        cache.set(key, result, settings.COUNT_CACHE_TIMEOUT)
+    return result
+
+
+class CachedCountPaginator(Paginator):
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        count, self.count_exact = get_count(self.object_list)
+        return count
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничная пагинация без COUNT(*) на каждый запрос.
+    Поле `count_exact` сообщает, точное ли количество в ответе."""
+
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.page.paginator.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class KeysetPagination(CursorPagination):
+    """Keyset-пагинация по всем полям `ordering`. Курсор хранит значения
+    полей последней строки, и следующая страница выбирается условием
+    `(pub_date, id) < (x, y)`, развёрнутым в
+    `pub_date < x OR (pub_date = x AND id < y)`. В отличие от
+    CursorPagination, строки с одинаковым первым полем не пропускаются
+    через OFFSET. Поля должны быть NOT NULL и вместе уникальными."""
+
+    def get_fields(self, queryset):
+        return [queryset.model._meta.get_field(name.lstrip('-'))
+                for name in self.ordering]
+
+    def encode_position(self, instance):
+        return json.dumps([field.value_to_string(instance)
+                           for field in self.fields])
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value)
+                    for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def seek(self, values, reverse):
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            lookup = 'lt' if name.startswith('-') != reverse else 'gt'
+            equal = {field.name: value for field, value
+                     in zip(self.fields[:index], values)}
+            condition |= Q(**equal, **{
+                f'{self.fields[index].name}__{lookup}': values[index]
+            })
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.fields = self.get_fields(queryset)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if self.cursor is not None:
+            queryset = queryset.filter(self.seek(
+                self.decode_position(self.cursor.position), reverse
+            ))
+        ordering = [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ] if reverse else self.ordering
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_link(self, instance, reverse):
+        # Пустая страница бывает только при переходе по курсору:
+        # ссылка в обратную сторону ведёт от него же.
+        position = (self.encode_position(instance) if instance is not None
+                    else self.cursor.position)
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse,
+                                         position=position))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_link(self.page[-1] if self.page else None, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.get_link(self.page[0] if self.page else None, True)
+
+
+class PageNumberOrCursorPagination(BasePagination):
+    """Постраничная пагинация по умолчанию.
+    С параметром `?pagination=cursor` — keyset-пагинация по полям
+    `cursor_ordering` представления: без OFFSET и COUNT(*),
+    время ответа не зависит от глубины страницы."""
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def __init__(self):
+        self.paginator = CachedCountPagination()
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+            or CursorPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.paginator = KeysetPagination()
+            self.paginator.ordering = view.cursor_ordering
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+
+class ChangeFeedPagination(BasePagination):
+    """Keyset-пагинация ленты в порядке (txid, id): `?after=<txid>-<id>`,
+    курсор последней прочитанной записи. Ссылка `next` есть всегда,
+    по ней клиент дочитывает ленту и затем опрашивает её в ожидании
+    новых записей. Записи незавершённых транзакций придерживаются
+    выборкой `committed()`, поэтому курсор их не перескочит."""
+
+    cursor_query_param = 'after'
+    page_size_query_param = 'limit'
+    page_size = 100
+    max_page_size = 1000
+
+    def get_cursor(self, request):
+        value = request.query_params.get(self.cursor_query_param, '0-0')
+        try:
+            txid, pk = map(int, value.split('-'))
+        except ValueError:
+            raise ValidationError(
+                {self.cursor_query_param: 'Expected a cursor <txid>-<id>'}
+            )
+        return txid, pk
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.page_size_query_param,
+                                                 self.page_size))
+        except ValueError:
+            raise ValidationError(
+                {self.page_size_query_param: 'Expected an integer'}
+            )
+        return min(max(limit, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.after = self.get_cursor(request)
+        txid, pk = self.after
+        self.page = list(queryset.committed().filter(
+            Q(txid__gt=txid) | Q(txid=txid, pk__gt=pk)
+        ).order_by('txid', 'pk')[:self.get_limit(request)])
+        return self.page
+
+    def get_paginated_response(self, data):
+        txid, pk = ((self.page[-1].txid, self.page[-1].pk) if self.page
+                    else self.after)
+        return Response(OrderedDict([
+            ('next', replace_query_param(self.request.build_absolute_uri(),
+                                         self.cursor_query_param,
+                                         f'{txid}-{pk}')),
+            ('results', data)
+        ]))
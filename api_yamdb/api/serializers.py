@@ -1,3 +1,4 @@
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import serializers
@@ -5,7 +6,8 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.fields import DateTimeField
 from rest_framework.relations import SlugRelatedField
 
-from reviews.models import Comment, Review, Title, Genre, Category, User
+from reviews.models import (Change, Comment, Review, Title, Genre, Category,
+                            SearchDocument, User, Tombstone)
 from .utils import validate_username, validate_email
 
 
@@ -33,15 +35,21 @@ class SignupSerializer(serializers.Serializer):
         fields = ('email', 'username')
 
     def validate(self, data):
-        user = User.objects.filter(email=data.get('email')).first()
-        if user and user.username != data.get('username'):
+        """Одним запросом находит пользователей с тем же email или
+        username. Если ни с кем нет конфликта, кладёт в `user`
+        совпавшего пользователя или None."""
+        email, username = data.get('email'), data.get('username')
+        users = list(User.objects.filter(
+            Q(email=email) | Q(username=username)
+        )[:2])
+        if any(user.email == email and user.username != username
+               for user in users):
             raise serializers.ValidationError(
                 'Another user with this email already exists')
-
-        user = User.objects.filter(username=data.get('username')).first()
-        if user and user.username == data.get(
-                'username') and user.email != data.get('email'):
+        if any(user.username == username and user.email != email
+               for user in users):
             raise serializers.ValidationError('Wrong email already exists')
+        data['user'] = users[0] if users else None
         return data
 
     def validate_username(self, data):
@@ -89,19 +97,19 @@ class TokenSerializer(serializers.Serializer):
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genre
-        exclude = ('id',)
+        exclude = ('id', 'updated_at')
 
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        exclude = ('id',)
+        exclude = ('id', 'updated_at')
 
 
 class TitleReadSerializer(serializers.ModelSerializer):
     category = CategorySerializer()
     genre = GenreSerializer(many=True)
-    rating = serializers.IntegerField()
+    rating = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Title
@@ -109,6 +117,18 @@ class TitleReadSerializer(serializers.ModelSerializer):
                   'description', 'category', 'rating')
 
 
+class LeaderboardTitleSerializer(TitleReadSerializer):
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('review_count',)
+
+
+class SimilarTitleSerializer(TitleReadSerializer):
+    similarity = serializers.FloatField()
+
+    class Meta(TitleReadSerializer.Meta):
+        fields = TitleReadSerializer.Meta.fields + ('similarity',)
+
+
 class TitleWriteSerializer(serializers.ModelSerializer):
     genre = serializers.SlugRelatedField(slug_field='slug',
                                          queryset=Genre.objects.all(),
@@ -166,3 +186,37 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date', 'review')
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tombstone
+        fields = ('model', 'object_id', 'deleted_at')
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Change
+        fields = ('id', 'model', 'object_id', 'action', 'created_at')
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    title_id = serializers.IntegerField()
+    text = serializers.CharField(source='body')
+    rank = serializers.FloatField()
+
+    class Meta:
+        model = SearchDocument
+        fields = ('type', 'id', 'title_id', 'text', 'rank')
+
+
+class AutocompleteSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=256)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class LeaderboardSerializer(serializers.Serializer):
+    min_reviews = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from reviews.models import (Category, Comment, Genre, Review, SimilarTitle,
+                            Title, Tombstone)
+from .authentication import snapshot_key
+from .autocomplete import title_index
+from .caching import invalidate
+
+# Модели из `cache_models` представлений и запросов с кэшированным
+# количеством. Остальные модели удаляются без выборки строк.
+CACHED_MODELS = (Title, Title.genre.through, Genre, Category, Review,
+                 Comment, get_user_model(), SimilarTitle, Tombstone)
+
+
+def invalidate_on_write(sender, **kwargs):
+    invalidate(sender)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(invalidate_on_write, sender=model)
+    post_delete.connect(invalidate_on_write, sender=model)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_on_m2m_change(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate(sender)
+
+
+@receiver(post_save, sender=Title)
+def index_title_name(sender, instance, **kwargs):
+    # После COMMIT: откаченное сохранение не должно попасть в индекс.
+    pk, name = instance.pk, instance.name
+    transaction.on_commit(lambda: title_index.update(pk, name))
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title_name(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: title_index.remove(pk))
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_user_snapshot(sender, instance, **kwargs):
+    cache.delete(snapshot_key(instance.pk))
@@ -0,0 +1,97 @@
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Ограничение частоты по скользящему окну из двух счётчиков:
+    число запросов в прошлом окне берётся с весом оставшейся доли
+    окна. В кэше два целых на ключ вместо списка отметок времени.
+
+    Область (`scope`) собирается из `throttle_scope` представления
+    и `scope_suffix` класса, например `signup_email`. Если частота
+    для области не задана в `DEFAULT_THROTTLE_RATES`, ограничения нет."""
+
+    scope_suffix = None
+
+    def __init__(self):
+        # Область известна только в allow_request.
+        pass
+
+    def allow_request(self, request, view):
+        throttle_scope = getattr(view, 'throttle_scope', None)
+        self.scope = f'{throttle_scope}_{self.scope_suffix}'
+        self.rate = self.THROTTLE_RATES.get(self.scope)
+        if throttle_scope is None or self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window, offset = divmod(self.timer(), self.duration)
+        previous, current = (f'{self.key}_{int(window) + shift}'
+                             for shift in (-1, 0))
+        counts = self.cache.get_many([previous, current])
+        self.previous_count = counts.get(previous, 0)
+        self.current_count = counts.get(current, 0)
+        self.offset = offset
+        if (self.previous_count * (1 - offset / self.duration)
+                + self.current_count >= self.num_requests):
+            return False
+        if not self.cache.add(current, 1, self.duration * 2):
+            try:
+                self.cache.incr(current)
+            except ValueError:
+                self.cache.set(current, 1, self.duration * 2)
+        return True
+
+    def wait(self):
+        remaining = self.duration - self.offset
+        allowed = self.num_requests - self.current_count
+        if allowed <= 0 or not self.previous_count:
+            return remaining
+        # Время, за которое вес прошлого окна упадёт ниже остатка лимита.
+        return max(
+            (1 - allowed / self.previous_count) * self.duration - self.offset,
+            0
+        )
+
+    def get_ident_value(self, request):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_value(request)
+        if not ident:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': hashlib.md5(ident.encode()).hexdigest(),
+        }
+
+
+class IPThrottle(SlidingWindowThrottle):
+    scope_suffix = 'ip'
+
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+
+class FieldThrottle(SlidingWindowThrottle):
+    """Считает запросы по значению поля `scope_suffix` тела запроса
+    без учёта регистра. Запросы без поля не ограничиваются."""
+
+    def get_ident_value(self, request):
+        data = request.data if hasattr(request.data, 'get') else {}
+        value = data.get(self.scope_suffix)
+        if not isinstance(value, str):
+            return None
+        return value.strip().lower()
+
+
+class EmailThrottle(FieldThrottle):
+    scope_suffix = 'email'
+
+
+class UsernameThrottle(FieldThrottle):
+    scope_suffix = 'username'
@@ -3,13 +3,17 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (ReviewViewSet, CommentViewSet, TitleViewSet, GenreViewSet,
                     CategoryViewSet, UserViewSet, SignupView,
-                    TokenObtainPairView)
+                    TokenObtainPairView, TombstoneViewSet, ChangeViewSet,
+                    SearchViewSet)
 
 router_v1 = DefaultRouter()
 router_v1.register(r'titles', TitleViewSet, basename='titles-read')
 router_v1.register(r'genres', GenreViewSet, basename='genres')
 router_v1.register(r'categories', CategoryViewSet, basename='categories')
 router_v1.register(r'users', UserViewSet, basename='users')
+router_v1.register(r'deleted', TombstoneViewSet, basename='deleted')
+router_v1.register(r'changes', ChangeViewSet, basename='changes')
+router_v1.register(r'search', SearchViewSet, basename='search')
 router_v1.register(r'titles/(?P<title_id>\d+)/reviews', ReviewViewSet,
                    'reviews')
 router_v1.register((r'titles/(?P<title_id>\d+)/reviews/'
@@ -1,34 +1,53 @@
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, filters, viewsets
+from rest_framework import status, filters, mixins, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from reviews.models import Title, Genre, Category, Review
-from .filters import TitleFilter
-from .mixins import CreateListDestroyMixin
+from reviews.models import (Title, Genre, Category, Review, Comment, Tombstone,
+                            Change, SearchDocument, SimilarTitle)
+from users.models import OutboxEmail
+from .autocomplete import title_index
+from .filters import ChangedSinceFilter, FullTextSearchFilter, TitleFilter
+from .mixins import (ConditionalListMixin, ConditionalRetrieveMixin,
+                     CreateListDestroyMixin)
+from .pagination import (CachedCountPagination, ChangeFeedPagination,
+                         PageNumberOrCursorPagination)
 from .permissions import (IsAuthor, IsAdmin, IsModerator, ReadOnly,
                           IsSuperuser, IsYourself)
 from .serializers import (TitleReadSerializer, TitleWriteSerializer,
                           GenreSerializer, CategorySerializer,
                           CommentSerializer, ReviewSerializer, User,
-                          UserSerializer, SignupSerializer, TokenSerializer)
-
-
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.annotate(rating=Avg('reviews__score')
-                                      ).all().order_by('id')
+                          UserSerializer, SignupSerializer, TokenSerializer,
+                          TombstoneSerializer, ChangeSerializer,
+                          SearchResultSerializer, AutocompleteSerializer,
+                          LeaderboardSerializer, LeaderboardTitleSerializer,
+                          SimilarTitleSerializer)
+from .throttling import EmailThrottle, IPThrottle, UsernameThrottle
+
+
+class TitleViewSet(ConditionalListMixin, ConditionalRetrieveMixin,
+                   viewsets.ModelViewSet):
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre'
+    ).order_by('id')
     permission_classes = [IsAdmin | ReadOnly]
-    pagination_class = PageNumberPagination
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('id',)
+    lookup_value_regex = r'\d+'
+    # Рейтинг хранится в Title, но обновляется через update() по отзывам.
+    cache_models = (Title, Title.genre.through, Genre, Category, Review,
+                    SimilarTitle)
+    cache_responses = True
+    filter_backends = (DjangoFilterBackend, ChangedSinceFilter)
     filterset_class = TitleFilter
 
     def get_serializer_class(self):
@@ -36,48 +55,148 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleReadSerializer
         return TitleWriteSerializer
 
+    def leaderboard(self, request, ordering, min_reviews):
+        serializer = LeaderboardSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        titles = self.filter_queryset(self.get_queryset()).filter(
+            review_count__gte=params.get('min_reviews', min_reviews)
+        ).order_by(*ordering)[:params['limit']]
+        return Response(LeaderboardTitleSerializer(titles, many=True).data)
+
+    @action(detail=False, url_path='top-rated')
+    def top_rated(self, request):
+        """Лучшие по рейтингу произведения с не менее чем `min_reviews`
+        отзывами; `?genre=` и `?category=` сужают выборку."""
+        return self.read_response(
+            self.leaderboard, request,
+            ordering=('-average_score', '-review_count', 'id'),
+            min_reviews=settings.LEADERBOARD_MIN_REVIEWS
+        )
+
+    @action(detail=False, url_path='most-reviewed')
+    def most_reviewed(self, request):
+        return self.read_response(
+            self.leaderboard, request,
+            ordering=('-review_count', 'id'), min_reviews=1
+        )
+
+    def similar_titles(self, request, pk):
+        titles = self.get_queryset().filter(similar_to__title_id=pk).annotate(
+            similarity=F('similar_to__score')
+        ).order_by('-similarity', 'id')
+        data = SimilarTitleSerializer(titles, many=True).data
+        if not data and not Title.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response(data)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Похожие произведения из индекса `refresh_similar_titles`."""
+        return self.read_response(self.similar_titles, request, pk=pk)
+
+    @action(detail=False)
+    def autocomplete(self, request):
+        """Подсказки названий по префиксу `?q=` из индекса в памяти."""
+        serializer = AutocompleteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response([
+            {'id': pk, 'name': name} for pk, name in title_index.complete(
+                serializer.validated_data['q'],
+                serializer.validated_data['limit']
+            )
+        ])
+
 
-class GenreViewSet(CreateListDestroyMixin):
+class GenreViewSet(ConditionalListMixin, CreateListDestroyMixin):
     queryset = Genre.objects.all().order_by('id')
     serializer_class = GenreSerializer
+    cache_models = (Genre,)
+    cache_responses = True
 
 
-class CategoryViewSet(CreateListDestroyMixin):
+class CategoryViewSet(ConditionalListMixin, CreateListDestroyMixin):
     queryset = Category.objects.all().order_by('id')
     serializer_class = CategorySerializer
+    cache_models = (Category,)
+    cache_responses = True
+
+
+class TombstoneViewSet(ConditionalListMixin, mixins.ListModelMixin,
+                       viewsets.GenericViewSet):
+    """Удалённые произведения, жанры, категории, отзывы и комментарии."""
+
+    queryset = Tombstone.objects.all()
+    serializer_class = TombstoneSerializer
+    permission_classes = [ReadOnly]
+    cache_models = (Tombstone,)
+    filter_backends = (DjangoFilterBackend, ChangedSinceFilter)
+    filterset_fields = ('model',)
+    changed_since_field = 'deleted_at'
+
+
+class ChangeViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Журнал изменений произведений, отзывов и комментариев."""
+
+    queryset = Change.objects.all()
+    serializer_class = ChangeSerializer
+    permission_classes = [ReadOnly]
+    pagination_class = ChangeFeedPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_fields = ('model',)
+
 
+class SearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Поиск по названиям и описаниям произведений и текстам отзывов."""
 
-class CommentViewSet(viewsets.ModelViewSet):
+    queryset = SearchDocument.objects.all()
+    serializer_class = SearchResultSerializer
+    permission_classes = [ReadOnly]
+    filter_backends = (FullTextSearchFilter,)
+
+
+class CommentViewSet(ConditionalListMixin, ConditionalRetrieveMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAdmin | IsModerator | IsAuthor | ReadOnly]
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
+    # Без отзыва список отвечает 404.
+    cache_models = (Comment, User, Review)
+    filter_backends = (ChangedSinceFilter,)
 
-    def get_queryset(self):
-        title_id = self.kwargs['title_id']
-        review_id = self.kwargs['review_id']
+    def get_review_filter(self):
+        return {'id': self.kwargs['review_id'],
+                'title_id': self.kwargs['title_id']}
 
-        title = get_object_or_404(
-            Title.objects.prefetch_related('reviews', 'reviews__comments'),
-            id=title_id
-        )
-
-        return title.reviews.get(id=review_id).comments.all()
+    def get_queryset(self):
+        # Один запрос по индексу вместо загрузки всех отзывов произведения.
+        if not Review.objects.filter(**self.get_review_filter()).exists():
+            raise Http404
+        return Comment.objects.filter(
+            review_id=self.kwargs['review_id']
+        ).select_related('author')
 
     def perform_create(self, serializer):
-        title_id = self.kwargs['title_id']
-        title = get_object_or_404(Title, id=title_id)
-        review_id = self.kwargs['review_id']
-        review = get_object_or_404(title.reviews, id=review_id)
-
+        review = get_object_or_404(Review, **self.get_review_filter())
         serializer.save(author=self.request.user, review=review)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalListMixin, ConditionalRetrieveMixin,
+                    viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [IsAdmin | IsModerator | IsAuthor | ReadOnly]
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering = ('-pub_date', '-id')
+    # Без произведения список отвечает 404.
+    cache_models = (Review, User, Title)
+    filter_backends = (ChangedSinceFilter,)
 
     def get_queryset(self):
         title_id = self.kwargs['title_id']
-        return Review.objects.filter(title__id=title_id)
+        return Review.objects.filter(title__id=title_id).select_related(
+            'author'
+        )
 
     def perform_create(self, serializer):
         title_id = self.kwargs['title_id']
@@ -93,20 +212,26 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return context
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalListMixin, ConditionalRetrieveMixin,
+                  viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsSuperuser | IsAdmin | IsYourself]
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPagination
     filter_backends = (DjangoFilterBackend, filters.SearchFilter,
                        filters.OrderingFilter)
     lookup_field = 'username'
     search_fields = ('username',)
     ordering = ('username',)
+    cache_models = (User,)
+
+    def get_me(self):
+        # request.user из кэша аутентификации содержит не все поля.
+        return get_object_or_404(User, pk=self.request.user.pk)
 
     def get_object(self):
         if self.kwargs.get('username') == 'me':
-            return self.request.user
+            return self.get_me()
         return super().get_object()
 
     def create(self, request, *args, **kwargs):
@@ -122,13 +247,13 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
-        serializer = self.get_serializer(request.user)
+        serializer = self.get_serializer(self.get_me())
         return Response(serializer.data)
 
     @me.mapping.patch
     def me_patch(self, request):
         serializer = self.get_serializer(
-            request.user, data=request.data, partial=True)
+            self.get_me(), data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
@@ -141,26 +266,44 @@ class UserViewSet(viewsets.ModelViewSet):
 class SignupView(APIView):
     serializer_class = SignupSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, EmailThrottle, UsernameThrottle)
+    throttle_scope = 'signup'
+
+    def register(self, data):
+        """Создаёт пользователя, если его нет, записывает код
+        подтверждения одним UPDATE и ставит письмо в outbox."""
+        user = data['user']
+        with transaction.atomic():
+            if user is None:
+                user = User.objects.create(email=data['email'],
+                                           username=data['username'])
+            # Код зависит от pk, поэтому у нового пользователя
+            # записывается после INSERT.
+            user.confirmation_code = default_token_generator.make_token(user)
+            User.objects.filter(pk=user.pk).update(
+                confirmation_code=user.confirmation_code
+            )
+
+            # Письмо отправит `manage.py send_emails`.
+            OutboxEmail.objects.create(
+                subject='Confirmation code',
+                body=f'Confirmation code: {user.confirmation_code}',
+                from_email=settings.ADMIN_EMAIL,
+                to=user.email,
+            )
+        return user
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
-
-        user, created = User.objects.get_or_create(
-            email=serializer.validated_data.get('email'),
-            username=serializer.validated_data.get('username')
-        )
-
-        user.confirmation_code = default_token_generator.make_token(user)
-        user.save(update_fields=['confirmation_code'])
-
-        send_mail(
-            'Confirmation code',
-            f'Confirmation code: {user.confirmation_code}',
-            settings.ADMIN_EMAIL,
-            [user.email],
-            fail_silently=False,
-        )
+        try:
+            user = self.register(serializer.validated_data)
+        except IntegrityError:
+            # Пользователя с теми же данными создали параллельно:
+            # повторная проверка найдёт его или вернёт ошибку.
+            serializer = self.serializer_class(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            user = self.register(serializer.validated_data)
 
         return Response({
             'email': user.email,
@@ -171,6 +314,8 @@ class SignupView(APIView):
 class TokenObtainPairView(APIView):
     serializer_class = TokenSerializer
     permission_classes = (AllowAny,)
+    throttle_classes = (IPThrottle, UsernameThrottle)
+    throttle_scope = 'token'
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
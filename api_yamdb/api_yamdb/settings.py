@@ -113,6 +113,12 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 ADMIN_EMAIL = 'from@admins.com'
 
+# Outbox emails are sent by `manage.py send_emails`; a failed message is
+# retried after EMAIL_OUTBOX_RETRY_DELAY * 2 ** attempts seconds.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+
 # JWT token
 
 REST_FRAMEWORK = {
@@ -121,13 +127,52 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+
+    # Signup and token endpoints, see api.throttling.
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': '30/hour',
+        'signup_email': '5/hour',
+        'signup_username': '5/hour',
+        'token_ip': '60/hour',
+        'token_username': '10/hour',
+    },
 }
 
+# Cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Pagination counts are cached for this many seconds and estimated by the
+# PostgreSQL planner when they exceed EXACT_COUNT_LIMIT rows.
+COUNT_CACHE_TIMEOUT = 60
+EXACT_COUNT_LIMIT = 100_000
+
+# Public title, genre and category reads are cached for this many seconds;
+# writes to the underlying models invalidate them earlier.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Titles with fewer reviews are left out of the top-rated leaderboards
+# unless ?min_reviews= is given.
+LEADERBOARD_MIN_REVIEWS = 3
+
+# refresh_similar_titles keeps this many neighbours per title, scored as
+# genre Jaccard + SIMILAR_TITLES_AUTHOR_WEIGHT * reviewer Jaccard.
+SIMILAR_TITLES_TOP_K = 10
+SIMILAR_TITLES_AUTHOR_WEIGHT = 0.5
+
+# Authenticated users are read from the cache for this many seconds,
+# see api.authentication.CachedJWTAuthentication.
+JWT_USER_CACHE_TIMEOUT = 60
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),
     'AUTH_HEADER_TYPES': ('Bearer',),
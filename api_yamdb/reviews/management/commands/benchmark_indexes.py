@@ -0,0 +1,101 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+from reviews.models import Category, Comment, Review, Title, User
+
+REPEAT = 20
+
+
+class Command(BaseCommand):
+    help = ("Seeds a large dataset inside a rolled back transaction and "
+            "compares plans and timings of review/comment feeds with and "
+            "without the composite indexes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=200)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=2,
+                            help='Comments per review')
+
+    def seed(self, titles_count, users_count, comments_count):
+        category = Category.objects.create(name='bench', slug='bench')
+        Title.objects.bulk_create(
+            Title(name=f'bench {idx}', year=2000, category=category)
+            for idx in range(titles_count)
+        )
+        User.objects.bulk_create(
+            User(username=f'bench{idx}', email=f'bench{idx}@yamdb.fake')
+            for idx in range(users_count)
+        )
+        titles = list(Title.objects.filter(category=category)
+                      .values_list('pk', flat=True))
+        users = list(User.objects.filter(username__startswith='bench')
+                     .values_list('pk', flat=True))
+        Review.objects.bulk_create(
+            (Review(title_id=title, author_id=user, text='bench', score=5)
+             for title in titles for user in users),
+            batch_size=1000
+        )
+        reviews = Review.objects.filter(title_id__in=titles).values_list(
+            'pk', 'author_id'
+        )
+        Comment.objects.bulk_create(
+            (Comment(review_id=review, author_id=author, text='bench')
+             for review, author in reviews.iterator()
+             for _ in range(comments_count)),
+            batch_size=1000
+        )
+        return titles[len(titles) // 2], users[len(users) // 2]
+
+    def queries(self, title_id, user_id):
+        review_id = Review.objects.filter(title_id=title_id).values_list(
+            'pk', flat=True
+        ).first()
+        return {
+            'reviews of title': Review.objects.filter(
+                title_id=title_id).order_by('-pub_date', '-id')[:5],
+            'comments of review': Comment.objects.filter(
+                review_id=review_id).order_by('-pub_date', '-id')[:5],
+            'reviews of author': Review.objects.filter(
+                author_id=user_id).order_by('-pub_date')[:5],
+        }
+
+    def explain(self, queryset, label):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            # Метка в комментарии не даёт sqlite3 взять из кэша
+            # план, построенный до удаления индексов.
+            cursor.execute(
+                f'{connection.ops.explain_query_prefix()} {sql} '
+                f'/* {label} */', params
+            )
+            return '\n'.join(' '.join(str(column) for column in row)
+                             for row in cursor.fetchall())
+
+    def measure(self, label, title_id, user_id):
+        print(f'=== {label}')
+        for name, queryset in self.queries(title_id, user_id).items():
+            started = time.perf_counter()
+            for _ in range(REPEAT):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / REPEAT * 1000
+            print(f'{name}: {elapsed:.3f} ms')
+            print(self.explain(queryset, label))
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            title_id, user_id = self.seed(
+                options['titles'], options['users'], options['comments']
+            )
+            print(f'Seeded {Review.objects.count()} reviews and '
+                  f'{Comment.objects.count()} comments')
+            self.measure('with composite indexes', title_id, user_id)
+            # DROP INDEX откатится вместе с транзакцией.
+            editor = connection.schema_editor()
+            for model in (Review, Comment):
+                for index in model._meta.indexes:
+                    editor.execute(index.remove_sql(model, editor))
+            self.measure('without composite indexes', title_id, user_id)
+            transaction.set_rollback(True)
@@ -0,0 +1,110 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+from django.core.management import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .load_data import BATCH_SIZE, FILES, FORMATS, MODELS, data_file
+
+FIELDS = {
+    'users.csv': ('id', 'username', 'email', 'role', 'bio', 'first_name',
+                  'last_name', 'password', 'is_superuser', 'is_staff',
+                  'is_active', 'date_joined', 'last_login'),
+    'category.csv': ('id', 'name', 'slug'),
+    'genre.csv': ('id', 'name', 'slug'),
+    'titles.csv': ('id', 'name', 'year', 'category_id', 'description'),
+    'review.csv': ('id', 'title_id', 'text', 'author_id', 'score',
+                   'pub_date'),
+    'comments.csv': ('id', 'review_id', 'text', 'author_id', 'pub_date'),
+    'genre_title.csv': ('id', 'title_id', 'genre_id'),
+}
+
+
+def write_csv(stream, fields, rows):
+    writer = csv.writer(stream)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow('' if value is None else value for value in row)
+
+
+class SnapshotEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder округляет время до миллисекунд,
+    а выгрузка должна загружаться обратно без потерь."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def write_ndjson(stream, fields, rows):
+    for row in rows:
+        stream.write(json.dumps(dict(zip(fields, row)), cls=SnapshotEncoder,
+                                ensure_ascii=False) + '\n')
+
+
+WRITERS = dict(zip(FORMATS, (write_csv, write_ndjson)))
+
+
+def export(path, model, fields, writer, chunk_size=BATCH_SIZE):
+    """Выгружает таблицу через серверный курсор,
+    держа в памяти не больше chunk_size строк.
+    Возвращает число выгруженных строк."""
+    exported = 0
+
+    def counted(rows):
+        nonlocal exported
+        for row in rows:
+            exported += 1
+            yield row
+
+    rows = model.objects.order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size
+    )
+    with open(path, 'w', encoding='utf-8', newline='') as stream:
+        print(path)
+        writer(stream, fields, counted(rows))
+    return exported
+
+
+class Command(BaseCommand):
+    help = "Dumps data to files in the format read by load_data"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory for the dumped files')
+        parser.add_argument(
+            '--format', choices=WRITERS, default='csv',
+            help='csv or ndjson, both readable by load_data --format'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=BATCH_SIZE,
+            help='Number of rows fetched from the database at once'
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['output'], exist_ok=True)
+        writer = WRITERS[options['format']]
+        started = time.monotonic()
+        exported = 0
+        # Все таблицы читаются из одного снимка: иначе отзыв, записанный
+        # между выгрузками таблиц, может сослаться на отсутствующее
+        # в выгрузке произведение.
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                    )
+            for file, model in zip(FILES, MODELS):
+                exported += export(
+                    os.path.join(options['output'],
+                                 data_file(file, options['format'])),
+                    model, FIELDS[file], writer, options['chunk_size']
+                )
+        elapsed = max(time.monotonic() - started, 1e-6)
+        print(f'Dumped {exported} rows in {elapsed:.2f}s '
+              f'({exported / elapsed:.0f} rows/s)')
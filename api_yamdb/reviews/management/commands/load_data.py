@@ -1,9 +1,23 @@
 import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import chain, islice, product
 
-from django.core.management import BaseCommand
+import django
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
 
-from reviews.models import (Title, Genre, Category, User,
-                            Review, Comment)
+from api.authentication import snapshot_key
+from api.caching import invalidate
+from reviews.models import (LOGGED_MODELS, Title, Genre, Category, User,
+                            SearchDocument, Review, Comment, Change,
+                            SimilarTitle, Tombstone, delete_in_batches)
 
 ALREDY_LOADED_ERROR_MESSAGE = """
 If you need to reload the child data from the CSV file,
@@ -15,26 +29,316 @@ FILES = [
     'comments.csv', 'genre_title.csv',
 ]
 MODELS = [User, Category, Genre, Title, Review, Comment, Title.genre.through]
+# Модели, которые загрузка меняет без сигналов: загруженные и производные.
+CHANGED_MODELS = MODELS + [Tombstone, Change, SearchDocument, SimilarTitle]
+FORMATS = ('csv', 'ndjson')
+BATCH_SIZE = 1000
+# Сколько секунд процесс ждёт блокировку записи SQLite.
+SQLITE_TIMEOUT = 600
 
 
-def import_csv(file, model):
-    with open(file, encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+def data_file(file, file_format):
+    """Имя файла таблицы в формате file_format: users.csv -> users.ndjson."""
+    return f'{os.path.splitext(file)[0]}.{file_format}'
+
+
+def read_rows(stream):
+    """Имена полей и строки-словари файла CSV с заголовком
+    или NDJSON (по расширению файла)."""
+    if not stream.name.endswith('.ndjson'):
+        reader = csv.DictReader(stream)
+        return reader.fieldnames or [], reader
+    rows = (json.loads(line) for line in stream if line.strip())
+    first = next(rows, None)
+    if first is None:
+        return [], rows
+    return list(first), chain([first], rows)
+
+
+def log_changes(model, objects, action):
+    """Пишет в журнал изменений пачку строк: bulk_create и bulk_update
+    не вызывают сигналы. Вызывается в транзакции загрузки файла."""
+    if model in LOGGED_MODELS:
+        Change.objects.bulk_create(
+            Change(model=model._meta.model_name, object_id=obj.pk,
+                   action=action)
+            for obj in objects
+        )
+
+
+def file_values(fields, row):
+    """Значения строки файла по полям модели. Пустая строка CSV
+    в поле, где пустых строк не бывает (даты, числа), — это NULL."""
+    return {
+        name: None if value == '' and not fields[name].empty_strings_allowed
+        else value
+        for name, value in row.items()
+    }
+
+
+@contextmanager
+def file_timestamps(fields):
+    """bulk_create заменяет значения полей auto_now_add текущим
+    временем. Поля, которые есть в файле, на время загрузки
+    берутся из файла: даты отзывов переживают выгрузку и загрузку."""
+    stamped = [field for field in fields.values()
+               if getattr(field, 'auto_now_add', False)]
+    for field in stamped:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in stamped:
+            field.auto_now_add = True
+
+
+def import_csv(file, model, batch_size=BATCH_SIZE):
+    """Загружает файл пачками через bulk_create в одной транзакции.
+    В памяти держится не больше batch_size строк.
+    Возвращает число загруженных строк."""
+    loaded = 0
+    with open(file, encoding='utf-8') as stream, transaction.atomic():
+        names, rows = read_rows(stream)
+        fields = {name: model._meta.get_field(name) for name in names}
+        print(file)
+        while True:
+            batch = [model(**file_values(fields, row))
+                     for row in islice(rows, batch_size)]
+            if not batch:
+                break
+            with file_timestamps(fields):
+                model.objects.bulk_create(batch, batch_size=batch_size)
+            log_changes(model, batch, Change.CREATED)
+            loaded += len(batch)
+    return loaded
+
+
+def upsert_csv(file, model, batch_size=BATCH_SIZE):
+    """Сверяет строки файла с БД по первичному ключу.
+    Новые строки вставляет, изменённые обновляет пачками.
+    Возвращает число вставленных и обновлённых строк
+    и множество первичных ключей из файла."""
+    created = updated = 0
+    seen = set()
+    with open(file, encoding='utf-8') as stream, transaction.atomic():
+        names, rows = read_rows(stream)
+        fields = {name: model._meta.get_field(name) for name in names}
+        # Поля auto_now при вставке не берутся из файла,
+        # поэтому и сравнивать их не нужно.
+        compared = [
+            field for field in fields.values()
+            if not field.primary_key and not getattr(field, 'auto_now', False)
+        ]
+        # bulk_update не обновляет auto_now сам.
+        touched = [field for field in model._meta.concrete_fields
+                   if getattr(field, 'auto_now', False)]
         print(file)
-        for row in reader:
-            model.objects.create(**row)
+        while True:
+            batch = {}
+            for row in islice(rows, batch_size):
+                obj = model(**{
+                    name: fields[name].to_python(value)
+                    for name, value in file_values(fields, row).items()
+                })
+                batch[obj.pk] = obj
+            if not batch:
+                break
+            seen.update(batch)
+            existing = model.objects.in_bulk(list(batch))
+            new = [obj for pk, obj in batch.items() if pk not in existing]
+            changed = [
+                obj for pk, obj in batch.items() if pk in existing
+                and any(getattr(obj, field.attname)
+                        != getattr(existing[pk], field.attname)
+                        for field in compared)
+            ]
+            with file_timestamps(fields):
+                model.objects.bulk_create(new, batch_size=batch_size)
+            if changed and compared:
+                now = timezone.now()
+                for obj, field in product(changed, touched):
+                    setattr(obj, field.attname, now)
+                model.objects.bulk_update(
+                    changed, [field.name for field in compared + touched],
+                    batch_size=batch_size
+                )
+            log_changes(model, new, Change.CREATED)
+            log_changes(model, changed, Change.UPDATED)
+            created += len(new)
+            updated += len(changed)
+    return created, updated, seen
+
+
+def prune(model, seen, batch_size=BATCH_SIZE):
+    """Удаляет строки, первичных ключей которых не было в файле."""
+    stale = [pk for pk in model.objects.values_list('pk', flat=True)
+             .iterator(chunk_size=batch_size) if pk not in seen]
+    for start in range(0, len(stale), batch_size):
+        model.objects.filter(pk__in=stale[start:start + batch_size]).delete()
+    return len(stale)
+
+
+def forget_user_snapshots(batch_size):
+    """Сбрасывает кэшированные для JWT снимки пользователей:
+    bulk_update меняет роли без сигнала post_save."""
+    ids = User.objects.values_list('pk', flat=True).iterator(batch_size)
+    while True:
+        batch = [snapshot_key(pk) for pk in islice(ids, batch_size)]
+        if not batch:
+            break
+        cache.delete_many(batch)
+
+
+def dependency_levels(models):
+    """Раскладывает модели по уровням по их внешним ключам.
+    Модели одного уровня не ссылаются друг на друга
+    и могут загружаться одновременно."""
+    remaining = {
+        model: {field.related_model for field in model._meta.concrete_fields
+                if field.is_relation and field.related_model in models
+                and field.related_model is not model}
+        for model in models
+    }
+    levels = []
+    while remaining:
+        level = [model for model in models if model in remaining
+                 and not remaining[model] & remaining.keys()]
+        if not level:
+            raise CommandError('Circular foreign keys between models')
+        levels.append(level)
+        for model in level:
+            del remaining[model]
+    return levels
+
+
+def begin_immediate(connection):
+    """Транзакции SQLite начинаются с BEGIN IMMEDIATE: сразу берут
+    блокировку записи и ждут её. Вызывается до открытия соединения."""
+    if django.VERSION >= (5, 1):
+        connection.settings_dict['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+        return
+    # До Django 5.1 режим не настраивается: BEGIN выполняет этот
+    # метод бэкенда sqlite3, других способов его заменить нет.
+    connection._start_transaction_under_autocommit = (
+        lambda: connection.cursor().execute('BEGIN IMMEDIATE')
+    )
+
+
+def setup_worker():
+    """Инициализирует процесс пула. SQLite допускает одного писателя:
+    иначе процессы, начавшие транзакцию с чтения, не смогут
+    повысить её до записи и получат database is locked."""
+    django.setup()
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['OPTIONS']['timeout'] = SQLITE_TIMEOUT
+        begin_immediate(connection)
+
+
+def load_in_process(loader, file, label, batch_size):
+    """Загружает файл в процессе пула. Модель передаётся меткой:
+    промежуточную модель ManyToMany нельзя передать через pickle."""
+    return loader(file, apps.get_model(label), batch_size)
 
 
 class Command(BaseCommand):
     help = "Loads data from somefiles.csv"
 
-    def handle(self, *args, **options):
-        for model in MODELS:
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='static/data',
+            help='Directory with the data files'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, default='csv',
+            help='Format of the files: csv or ndjson written by dump_data'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Number of rows inserted by one bulk_create'
+        )
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Insert new and update changed rows instead of reloading'
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='With --upsert, delete rows that are missing from the files'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes loading files at the same time'
+        )
+
+    def load(self, loader, batch_size, workers):
+        """Загружает файлы уровень за уровнем графа зависимостей.
+        Возвращает результаты loader по моделям."""
+        paths = {
+            model: os.path.join(self.path, data_file(file, self.format))
+            for file, model in zip(FILES, MODELS)
+        }
+        if workers == 1:
+            return {model: loader(paths[model], model, batch_size)
+                    for model in MODELS}
+        results = {}
+        # Дочерние процессы не должны унаследовать открытое соединение.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=setup_worker) as executor:
+            for level in dependency_levels(MODELS):
+                futures = {
+                    model: executor.submit(
+                        load_in_process, loader, paths[model],
+                        model._meta.label, batch_size
+                    )
+                    for model in level
+                }
+                for model, future in futures.items():
+                    results[model] = future.result()
+        return results
+
+    def upsert(self, batch_size, workers, with_prune):
+        seen = {}
+        results = self.load(upsert_csv, batch_size, workers)
+        for model, (created, updated, seen[model]) in results.items():
+            print(model, f'{created} created, {updated} updated')
+        if with_prune:
+            for model in reversed(MODELS):
+                print(model, f'{prune(model, seen[model], batch_size)} pruned')
+        return sum(len(keys) for keys in seen.values())
+
+    def reload(self, batch_size, workers):
+        # Зависимые таблицы очищаются раньше: delete_in_batches
+        # не пишет журнал для строк, удалённых каскадом.
+        for model in reversed(MODELS):
             if model.objects.exists():
                 print(model, ' data already loaded....')
                 print("Deleting data")
-                model.objects.all().delete()
+                delete_in_batches(model.objects.all(), batch_size)
                 print("Data is deleted")
         print("Loading data")
-        for file, model in zip(FILES, MODELS):
-            import_csv(f'static/data/{file}', model)
+        return sum(self.load(import_csv, batch_size, workers).values())
+
+    def handle(self, *args, **options):
+        if options['prune'] and not options['upsert']:
+            raise CommandError('--prune can only be used with --upsert')
+        self.path = options['path']
+        self.format = options['format']
+        started = time.monotonic()
+        if options['upsert']:
+            loaded = self.upsert(options['batch_size'], options['workers'],
+                                 options['prune'])
+        else:
+            loaded = self.reload(options['batch_size'], options['workers'])
+        # bulk_create не вызывает сигналы, поэтому рейтинг считаем заново.
+        Title.objects.recalculate_ratings()
+        SearchDocument.objects.rebuild(options['batch_size'])
+        Title.objects.update(similarity_stale=True)
+        # Сигналы при загрузке не вызывались. Сбрасываем только записи
+        # кэша по изменённым моделям: кэш может быть общим с другими
+        # процессами и хранить счётчики троттлинга.
+        for model in CHANGED_MODELS:
+            invalidate(model)
+        forget_user_snapshots(options['batch_size'])
+        elapsed = max(time.monotonic() - started, 1e-6)
+        print(f'Loaded {loaded} rows in {elapsed:.2f}s '
+              f'({loaded / elapsed:.0f} rows/s)')
@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from reviews.models import SearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index from titles and reviews"
+
+    def handle(self, *args, **options):
+        indexed = SearchDocument.objects.rebuild()
+        print(f'Indexed {indexed} documents')
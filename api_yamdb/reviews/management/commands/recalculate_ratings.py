@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = "Recalculates stored title ratings from the reviews table"
+
+    def handle(self, *args, **options):
+        updated = Title.objects.recalculate_ratings()
+        print(f'Ratings recalculated for {updated} titles')
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from reviews.similarity import refresh_similar_titles
+
+
+class Command(BaseCommand):
+    help = ("Recomputes stored similar titles for titles whose genres or "
+            "reviewers changed since the last run")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute similar titles for every title')
+        parser.add_argument('--top-k', type=int, default=None,
+                            help='Neighbours stored per title')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_similar_titles(options['full'], options['top_k'])
+        print(f'Similar titles refreshed for {refreshed} titles')
@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-18 10:13
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Sum
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    titles = Title.objects.annotate(
+        total=Sum('reviews__score'), count=Count('reviews'),
+        average=Avg('reviews__score'),
+    ).filter(count__gt=0)
+    for title in titles.iterator():
+        Title.objects.filter(pk=title.pk).update(
+            score_sum=title.total, review_count=title.count,
+            rating=int(title.average),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='rating'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='review count'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='score sum'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
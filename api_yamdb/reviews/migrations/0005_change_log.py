@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_updated_at_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32, verbose_name='model')),
+                ('object_id', models.BigIntegerField(verbose_name='object id')),
+                ('action', models.CharField(choices=[('created', 'created'), ('updated', 'updated'), ('deleted', 'deleted')], max_length=7, verbose_name='action')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Изменения',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 3.2 on 2026-10-18 10:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE reviews_searchdocument_fts USING fts5("
+    "body, content='reviews_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER reviews_searchdocument_ai AFTER INSERT "
+    "ON reviews_searchdocument BEGIN "
+    "INSERT INTO reviews_searchdocument_fts(rowid, body) "
+    "VALUES (new.id, new.body); END",
+    "CREATE TRIGGER reviews_searchdocument_ad AFTER DELETE "
+    "ON reviews_searchdocument BEGIN "
+    "INSERT INTO reviews_searchdocument_fts(reviews_searchdocument_fts, "
+    "rowid, body) VALUES ('delete', old.id, old.body); END",
+    "CREATE TRIGGER reviews_searchdocument_au AFTER UPDATE "
+    "ON reviews_searchdocument BEGIN "
+    "INSERT INTO reviews_searchdocument_fts(reviews_searchdocument_fts, "
+    "rowid, body) VALUES ('delete', old.id, old.body); "
+    "INSERT INTO reviews_searchdocument_fts(rowid, body) "
+    "VALUES (new.id, new.body); END",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS reviews_searchdocument_au',
+    'DROP TRIGGER IF EXISTS reviews_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS reviews_searchdocument_ai',
+    'DROP TABLE IF EXISTS reviews_searchdocument_fts',
+]
+POSTGRES_INDEX = [
+    'CREATE INDEX reviews_searchdocument_body_gin '
+    'ON reviews_searchdocument '
+    "USING gin (to_tsvector('simple', body))",
+]
+POSTGRES_DROP = ['DROP INDEX IF EXISTS reviews_searchdocument_body_gin']
+
+
+def run_for_vendor(sqlite, postgresql):
+    def run(apps, schema_editor):
+        statements = {'sqlite': sqlite, 'postgresql': postgresql}.get(
+            schema_editor.connection.vendor, []
+        )
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+def fill_documents(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    SearchDocument = apps.get_model('reviews', 'SearchDocument')
+    SearchDocument.objects.bulk_create(
+        (SearchDocument(kind='title', object_id=title.pk, title_id=title.pk,
+                        body=f'{title.name}\n{title.description or ""}')
+         for title in Title.objects.iterator()),
+        batch_size=1000
+    )
+    SearchDocument.objects.bulk_create(
+        (SearchDocument(kind='review', object_id=review.pk,
+                        title_id=review.title_id, body=review.text)
+         for review in Review.objects.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_review_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('title', 'title'), ('review', 'review')], max_length=6, verbose_name='kind')),
+                ('object_id', models.BigIntegerField(verbose_name='object id')),
+                ('body', models.TextField(verbose_name='body')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.title', verbose_name='title')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(
+            run_for_vendor(SQLITE_INDEX, POSTGRES_INDEX),
+            run_for_vendor(SQLITE_DROP, POSTGRES_DROP),
+        ),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-rating', '-review_count', 'id'], name='title_rating'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-review_count', 'id'], name='title_review_count'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-rating', '-review_count'], name='title_category_rating'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-review_count'], name='title_category_review_count'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 11:08
+
+from django.db import migrations, models
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+
+def fill_average_scores(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Title.objects.filter(review_count__gt=0).update(
+        average_score=Cast('score_sum', FloatField()) / F('review_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_similar_titles'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_rating',
+        ),
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_category_rating',
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='average_score',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='average score'),
+        ),
+        migrations.RunPython(fill_average_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-average_score', '-review_count', 'id'], name='title_average_score'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-average_score', '-review_count'], name='title_category_average_score'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+# Транзакция каждой записи журнала: лента отдаёт записи только
+# завершённых транзакций (ChangeQuerySet.committed).
+POSTGRES_TRIGGER = [
+    'CREATE FUNCTION reviews_change_txid() RETURNS trigger AS $$ '
+    'BEGIN NEW.txid := txid_current(); RETURN NEW; END; '
+    '$$ LANGUAGE plpgsql',
+    'CREATE TRIGGER reviews_change_txid BEFORE INSERT ON reviews_change '
+    'FOR EACH ROW EXECUTE PROCEDURE reviews_change_txid()',
+]
+POSTGRES_DROP = [
+    'DROP TRIGGER IF EXISTS reviews_change_txid ON reviews_change',
+    'DROP FUNCTION IF EXISTS reviews_change_txid()',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_title_average_score'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='change',
+            options={'ordering': ['txid', 'id'], 'verbose_name': 'Изменение', 'verbose_name_plural': 'Изменения'},
+        ),
+        migrations.AddField(
+            model_name='change',
+            name='txid',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='transaction id'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['txid', 'id'], name='change_txid_id'),
+        ),
+        migrations.RunPython(run_on_postgresql(POSTGRES_TRIGGER),
+                             run_on_postgresql(POSTGRES_DROP)),
+    ]
@@ -1,10 +1,30 @@
+import re
+from contextvars import ContextVar
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import (Case, Count, F, FloatField, OuterRef, Subquery,
+                              Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 
 from .validators import validate_alphanumeric, score_validator, validate_year
 
 User = get_user_model()
 
+# Внутри delete_in_batches надгробия и журнал изменений пишутся
+# пачкой, а построчные приёмники сигналов удаления пропускаются.
+bulk_deleting = ContextVar('bulk_deleting', default=False)
+
+
+class AtomicSaveMixin:
+    """Сохраняет объект вместе с записями из post_save-сигналов
+    в одной транзакции."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Genre(models.Model):
     name = models.TextField(max_length=256, verbose_name='slug')
@@ -13,6 +33,7 @@ class Genre(models.Model):
         unique=True,
         verbose_name='slug'
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'жанр'
@@ -22,7 +43,53 @@ class Genre(models.Model):
         return self.slug
 
 
-class Title(models.Model):
+class TitleQuerySet(models.QuerySet):
+    def apply_review_delta(self, score_delta, count_delta):
+        """Сдвигает сохранённую сумму оценок и число отзывов
+        и пересчитывает рейтинг и среднюю оценку одним UPDATE.
+        Если изменился состав авторов отзывов, помечает устаревшими
+        похожие произведения."""
+        score_sum = F('score_sum') + score_delta
+        review_count = F('review_count') + count_delta
+        no_reviews = When(review_count__lte=-count_delta, then=Value(None))
+        fields = {
+            'score_sum': score_sum,
+            'review_count': review_count,
+            'updated_at': timezone.now(),
+            'rating': Case(no_reviews, default=score_sum / review_count),
+            'average_score': Case(
+                no_reviews,
+                default=Cast(score_sum, FloatField()) / review_count,
+            ),
+        }
+        if count_delta:
+            fields['similarity_stale'] = True
+        return self.update(**fields)
+
+    def recalculate_ratings(self):
+        """Полностью пересчитывает рейтинг по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        self.update(
+            score_sum=Coalesce(Subquery(
+                reviews.annotate(total=Sum('score')).values('total')
+            ), 0),
+            review_count=Coalesce(Subquery(
+                reviews.annotate(total=Count('pk')).values('total')
+            ), 0),
+        )
+        no_reviews = When(review_count=0, then=Value(None))
+        return self.update(
+            rating=Case(no_reviews,
+                        default=F('score_sum') / F('review_count')),
+            average_score=Case(no_reviews, default=Cast(
+                'score_sum', FloatField()
+            ) / F('review_count')),
+        )
+
+
+class Title(AtomicSaveMixin, models.Model):
     name = models.TextField(max_length=256, verbose_name='name')
     year = models.IntegerField(verbose_name='year', validators=[validate_year])
     genre = models.ManyToManyField(Genre, verbose_name='genre')
@@ -31,15 +98,54 @@ class Title(models.Model):
                                  verbose_name='category')
     description = models.TextField(default='', null=True, blank=True,
                                    verbose_name='description')
+    score_sum = models.PositiveIntegerField(default=0, editable=False,
+                                            verbose_name='score sum')
+    review_count = models.PositiveIntegerField(default=0, editable=False,
+                                               verbose_name='review count')
+    rating = models.PositiveSmallIntegerField(null=True, blank=True,
+                                              editable=False,
+                                              verbose_name='rating')
+    # Точная средняя оценка: rating округлён вниз и не различает,
+    # например, 9.9 и 9.0.
+    average_score = models.FloatField(null=True, blank=True, editable=False,
+                                      verbose_name='average score')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    similarity_stale = models.BooleanField(default=True, db_index=True,
+                                           editable=False,
+                                           verbose_name='similarity stale')
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'произведение'
         verbose_name_plural = 'произведения'
         ordering = ['id']
+        # Для рейтингов: выборка читается по индексу в порядке выдачи.
+        indexes = [
+            models.Index(fields=['-average_score', '-review_count', 'id'],
+                         name='title_average_score'),
+            models.Index(fields=['-review_count', 'id'],
+                         name='title_review_count'),
+            models.Index(
+                fields=['category', '-average_score', '-review_count'],
+                name='title_category_average_score'
+            ),
+            models.Index(fields=['category', '-review_count'],
+                         name='title_category_review_count'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def delete(self, *args, **kwargs):
+        # Комментарии и отзывы удаляются пачками, а не каскадом
+        # с запросами в сигналах на каждую строку. Рейтинг и поисковые
+        # документы уходят вместе с произведением.
+        with transaction.atomic():
+            delete_in_batches(Comment.objects.filter(review__title=self))
+            delete_in_batches(Review.objects.filter(title=self))
+            return super().delete(*args, **kwargs)
+
 
 class Category(models.Model):
     name = models.TextField(max_length=256, verbose_name='name')
@@ -48,6 +154,7 @@ class Category(models.Model):
         unique=True,
         verbose_name='slug'
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Категория'
@@ -57,7 +164,7 @@ class Category(models.Model):
         return self.slug
 
 
-class Review(models.Model):
+class Review(AtomicSaveMixin, models.Model):
     title = models.ForeignKey(Title, related_name='reviews',
                               on_delete=models.CASCADE)
     author = models.ForeignKey(User, related_name='reviews',
@@ -65,6 +172,7 @@ class Review(models.Model):
     text = models.TextField()
     score = models.IntegerField(validators=(score_validator,))
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Отзыв'
@@ -75,17 +183,258 @@ class Review(models.Model):
                 fields=['title', 'author'], name='unique_title_author'
             )
         ]
+        # Совпадают с порядком лент отзывов и keyset-пагинации.
+        indexes = [
+            models.Index(fields=['title', '-pub_date', '-id'],
+                         name='review_title_pub_date'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='review_author_pub_date'),
+        ]
 
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            delete_in_batches(Comment.objects.filter(review=self))
+            return super().delete(*args, **kwargs)
 
-class Comment(models.Model):
+
+class Comment(AtomicSaveMixin, models.Model):
     review = models.ForeignKey(Review, related_name='comments',
                                on_delete=models.CASCADE)
     author = models.ForeignKey(User, related_name='comments',
                                on_delete=models.CASCADE)
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['review', '-pub_date', '-id'],
+                         name='comment_review_pub_date'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='comment_author_pub_date'),
+        ]
+
+
+class Tombstone(models.Model):
+    """Запись об удалённом объекте для инкрементальной синхронизации."""
+
+    model = models.CharField(max_length=32, verbose_name='model')
+    object_id = models.BigIntegerField(verbose_name='object id')
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Удалённый объект'
+        verbose_name_plural = 'Удалённые объекты'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'],
+                         name='tombstone_model_deleted_at'),
+        ]
+
+
+class ChangeQuerySet(models.QuerySet):
+    def committed(self):
+        """Записи, перед которыми в порядке (txid, id) уже не появится
+        новых. На PostgreSQL это записи транзакций старше самой старой
+        незавершённой: id выдаются до COMMIT, и транзакция с меньшим id
+        может зафиксироваться позже. На SQLite писатель один, id растут
+        в порядке фиксации, а txid всегда 0."""
+        if connection.vendor != 'postgresql':
+            return self
+        return self.extra(where=[
+            'txid < txid_snapshot_xmin(txid_current_snapshot())'
+        ])
+
+
+class Change(models.Model):
+    """Запись журнала изменений произведений, отзывов и комментариев.
+    На PostgreSQL `txid` заполняет триггер (миграция 0011)."""
+
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTIONS = (
+        (CREATED, 'created'),
+        (UPDATED, 'updated'),
+        (DELETED, 'deleted'),
+    )
+
+    model = models.CharField(max_length=32, verbose_name='model')
+    object_id = models.BigIntegerField(verbose_name='object id')
+    action = models.CharField(max_length=7, choices=ACTIONS,
+                              verbose_name='action')
+    created_at = models.DateTimeField(auto_now_add=True)
+    txid = models.BigIntegerField(default=0, editable=False,
+                                  verbose_name='transaction id')
+
+    objects = ChangeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Изменения'
+        ordering = ['txid', 'id']
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='change_txid_id'),
+        ]
+
+
+class SimilarTitle(models.Model):
+    """Одно из top-k похожих произведений, рассчитанных
+    командой `refresh_similar_titles`."""
+
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              related_name='similar_titles',
+                              verbose_name='title')
+    similar = models.ForeignKey(Title, on_delete=models.CASCADE,
+                                related_name='similar_to',
+                                verbose_name='similar title')
+    score = models.FloatField(verbose_name='score')
+
+    class Meta:
+        verbose_name = 'Похожее произведение'
+        verbose_name_plural = 'Похожие произведения'
+        ordering = ['title', '-score', 'similar']
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'similar'],
+                                    name='unique_similar_title')
+        ]
+
+
+class SearchDocumentQuerySet(models.QuerySet):
+    def search(self, text):
+        """Документы, содержащие все слова запроса, с релевантностью
+        в поле `rank` (чем больше, тем выше в выдаче)."""
+        terms = re.findall(r'\w+', text)
+        if not terms:
+            return self.none()
+        if connection.vendor == 'sqlite':
+            # Слова берутся в кавычки, чтобы не разбирать синтаксис FTS5.
+            return self.extra(
+                select={'rank': '-bm25(reviews_searchdocument_fts)'},
+                tables=['reviews_searchdocument_fts'],
+                where=[
+                    'reviews_searchdocument_fts.rowid = '
+                    'reviews_searchdocument.id',
+                    'reviews_searchdocument_fts MATCH %s',
+                ],
+                params=[' '.join(f'"{term}"' for term in terms)],
+            ).order_by('-rank', 'id')
+        if connection.vendor == 'postgresql':
+            vector = "to_tsvector('simple', reviews_searchdocument.body)"
+            query = "plainto_tsquery('simple', %s)"
+            return self.extra(
+                select={'rank': f'ts_rank({vector}, {query})'},
+                select_params=[' '.join(terms)],
+                where=[f'{vector} @@ {query}'],
+                params=[' '.join(terms)],
+            ).order_by('-rank', 'id')
+        documents = self
+        for term in terms:
+            documents = documents.filter(body__icontains=term)
+        return documents.annotate(
+            rank=models.Value(0.0, output_field=models.FloatField())
+        ).order_by('id')
+
+    def rebuild(self, batch_size=1000):
+        """Заново строит индекс по произведениям и отзывам."""
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (SearchDocument.for_title(title) for title in
+                 Title.objects.only('name', 'description').iterator()),
+                batch_size=batch_size
+            )
+            self.bulk_create(
+                (SearchDocument.for_review(review) for review in
+                 Review.objects.only('title_id', 'text').iterator()),
+                batch_size=batch_size
+            )
+        return self.count()
+
+
+class SearchDocument(models.Model):
+    """Документ полнотекстового индекса: название и описание
+    произведения или текст отзыва. На SQLite индексируется таблицей
+    FTS5, на PostgreSQL — GIN-индексом по tsvector (миграция 0007)."""
+
+    TITLE = 'title'
+    REVIEW = 'review'
+    KINDS = (
+        (TITLE, 'title'),
+        (REVIEW, 'review'),
+    )
+
+    kind = models.CharField(max_length=6, choices=KINDS, verbose_name='kind')
+    object_id = models.BigIntegerField(verbose_name='object id')
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              related_name='+', verbose_name='title')
+    body = models.TextField(verbose_name='body')
+
+    objects = SearchDocumentQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Поисковый документ'
+        verbose_name_plural = 'Поисковые документы'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'],
+                                    name='unique_search_document')
+        ]
+
+    @classmethod
+    def for_title(cls, title):
+        return cls(kind=cls.TITLE, object_id=title.pk, title_id=title.pk,
+                   body=f'{title.name}\n{title.description or ""}')
+
+    @classmethod
+    def for_review(cls, review):
+        return cls(kind=cls.REVIEW, object_id=review.pk,
+                   title_id=review.title_id, body=review.text)
+
+    def sync(self):
+        """Создаёт или обновляет документ с тем же kind и object_id."""
+        return SearchDocument.objects.update_or_create(
+            kind=self.kind, object_id=self.object_id,
+            defaults={'title_id': self.title_id, 'body': self.body},
+        )
+
+
+SYNCED_MODELS = (Title, Genre, Category, Review, Comment)
+LOGGED_MODELS = (Title, Review, Comment)
+
+
+def delete_in_batches(queryset, batch_size=1000):
+    """Удаляет строки выборки пачками. Надгробия и записи журнала
+    изменений пишутся одним INSERT на пачку в транзакции удаления,
+    построчные приёмники сигналов удаления пропускаются: рейтинги,
+    поиск и похожие произведения пересчитывает вызывающий.
+    Строки, ссылающиеся на удаляемые, нужно удалить раньше.
+    Возвращает число удалённых строк."""
+    model = queryset.model
+    name = model._meta.model_name
+    deleted = 0
+    token = bulk_deleting.set(True)
+    try:
+        while True:
+            with transaction.atomic():
+                batch = list(queryset.order_by('pk').values_list(
+                    'pk', flat=True
+                )[:batch_size])
+                if not batch:
+                    return deleted
+                if model in SYNCED_MODELS:
+                    Tombstone.objects.bulk_create(
+                        Tombstone(model=name, object_id=pk) for pk in batch
+                    )
+                if model in LOGGED_MODELS:
+                    Change.objects.bulk_create(
+                        Change(model=name, object_id=pk,
+                               action=Change.DELETED)
+                        for pk in batch
+                    )
+                model.objects.filter(pk__in=batch).delete()
+            deleted += len(batch)
+    finally:
+        bulk_deleting.reset(token)
@@ -0,0 +1,128 @@
+from functools import wraps
+
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .models import (LOGGED_MODELS, SYNCED_MODELS, Change, Genre, Review,
+                     SearchDocument, Title, Tombstone, bulk_deleting)
+
+
+def unless_bulk_deleting(handler):
+    """Пропускает приёмник внутри delete_in_batches."""
+    @wraps(handler)
+    def wrapper(*args, **kwargs):
+        if not bulk_deleting.get():
+            return handler(*args, **kwargs)
+    return wrapper
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_score(sender, instance, **kwargs):
+    """Запоминает сохранённые в БД оценку и произведение отзыва."""
+    instance._previous_score = None
+    if instance.pk is not None:
+        instance._previous_score = Review.objects.filter(
+            pk=instance.pk
+        ).values('title_id', 'score').first()
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_score', None)
+    if previous and previous['title_id'] == instance.title_id:
+        Title.objects.filter(pk=instance.title_id).apply_review_delta(
+            instance.score - previous['score'], 0
+        )
+        return
+    if previous:
+        Title.objects.filter(pk=previous['title_id']).apply_review_delta(
+            -previous['score'], -1
+        )
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        instance.score, 1
+    )
+
+
+@receiver(post_delete, sender=Review)
+@unless_bulk_deleting
+def update_rating_on_delete(sender, instance, **kwargs):
+    Title.objects.filter(pk=instance.title_id).apply_review_delta(
+        -instance.score, -1
+    )
+
+
+@unless_bulk_deleting
+def create_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model=sender._meta.model_name,
+                             object_id=instance.pk)
+
+
+def log_save(sender, instance, created, **kwargs):
+    Change.objects.create(
+        model=sender._meta.model_name, object_id=instance.pk,
+        action=Change.CREATED if created else Change.UPDATED
+    )
+
+
+@unless_bulk_deleting
+def log_delete(sender, instance, **kwargs):
+    Change.objects.create(model=sender._meta.model_name,
+                          object_id=instance.pk, action=Change.DELETED)
+
+
+# Приёмники подключаются к конкретным моделям: приёмник post_delete
+# без sender отключает быстрое удаление (без выборки строк) у всех моделей.
+for model in SYNCED_MODELS:
+    post_delete.connect(create_tombstone, sender=model)
+for model in LOGGED_MODELS:
+    post_save.connect(log_save, sender=model)
+    post_delete.connect(log_delete, sender=model)
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, **kwargs):
+    SearchDocument.for_title(instance).sync()
+
+
+@receiver(post_save, sender=Review)
+def index_review(sender, instance, **kwargs):
+    SearchDocument.for_review(instance).sync()
+
+
+@receiver(post_delete, sender=Review)
+@unless_bulk_deleting
+def unindex_review(sender, instance, **kwargs):
+    # Документы произведения удаляются каскадом вместе с ним.
+    SearchDocument.objects.filter(kind=SearchDocument.REVIEW,
+                                  object_id=instance.pk).delete()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def mark_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Жанры произведения изменились — похожие нужно пересчитать."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        titles = Title.objects.filter(pk=instance.pk)
+    elif pk_set:
+        titles = Title.objects.filter(pk__in=pk_set)
+    else:
+        titles = Title.objects.filter(genre=instance)
+    titles.update(similarity_stale=True)
+
+
+@receiver(pre_delete, sender=Genre)
+@unless_bulk_deleting
+def mark_genre_deleted(sender, instance, **kwargs):
+    Title.objects.filter(genre=instance).update(similarity_stale=True)
+
+
+@receiver(pre_delete, sender=Title)
+@unless_bulk_deleting
+def mark_similar_deleted(sender, instance, **kwargs):
+    # Строки с удаляемым произведением удалятся каскадом, и в списках
+    # похожих станет меньше top-k записей.
+    Title.objects.filter(similar_titles__similar=instance).update(
+        similarity_stale=True
+    )
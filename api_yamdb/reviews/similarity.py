@@ -0,0 +1,171 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from api.caching import invalidate
+from .models import Review, SimilarTitle, Title
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def group(pairs, positions):
+    """Множества признаков (жанров, авторов) по позициям произведений
+    и обратный индекс признак -> позиции."""
+    sets = [set() for _ in positions]
+    for title_id, feature in pairs:
+        if title_id in positions:
+            sets[positions[title_id]].add(feature)
+    inverted = defaultdict(list)
+    for position, features in enumerate(sets):
+        for feature in features:
+            inverted[feature].append(position)
+    return sets, inverted
+
+
+class SimilarityIndex:
+    """Сходство произведений: коэффициент Жаккара по жанрам плюс
+    взвешенный коэффициент Жаккара по авторам отзывов.
+
+    Пересечения считаются по обратным индексам: для произведения
+    складываются списки произведений каждого его жанра и автора.
+    С NumPy это один bincount на признак вместо цикла по парам."""
+
+    def __init__(self, title_ids, genre_pairs, author_pairs, author_weight):
+        self.title_ids = sorted(title_ids)
+        self.positions = {pk: pos for pos, pk in enumerate(self.title_ids)}
+        self.author_weight = author_weight
+        self.features = [group(genre_pairs, self.positions),
+                         group(author_pairs, self.positions)]
+        if np is not None:
+            self.sizes = [np.array([len(item) for item in sets], dtype=float)
+                          for sets, _ in self.features]
+            self.inverted = [
+                {feature: np.array(items) for feature, items in inv.items()}
+                for _, inv in self.features
+            ]
+
+    @classmethod
+    def load(cls):
+        return cls(
+            Title.objects.values_list('pk', flat=True),
+            Title.genre.through.objects.values_list('title_id', 'genre_id'),
+            Review.objects.values_list('title_id', 'author_id'),
+            settings.SIMILAR_TITLES_AUTHOR_WEIGHT,
+        )
+
+    def scores(self, position):
+        """Позиции произведений с ненулевым сходством и само сходство."""
+        if np is not None:
+            return self.vector_scores(position)
+        result = Counter()
+        for (sets, inverted), weight in zip(self.features,
+                                            (1, self.author_weight)):
+            size = len(sets[position])
+            counts = Counter(other for feature in sets[position]
+                             for other in inverted[feature])
+            for other, count in counts.items():
+                result[other] += weight * (
+                    count / (size + len(sets[other]) - count)
+                )
+        result.pop(position, None)
+        return list(result), list(result.values())
+
+    def vector_scores(self, position):
+        total = np.zeros(len(self.title_ids))
+        for index, weight in enumerate((1, self.author_weight)):
+            sets, _ = self.features[index]
+            sizes = self.sizes[index]
+            if not sets[position]:
+                continue
+            counts = np.bincount(np.concatenate([
+                self.inverted[index][feature] for feature in sets[position]
+            ]), minlength=len(self.title_ids)).astype(float)
+            union = sizes + sizes[position] - counts
+            total += weight * np.divide(counts, union, where=counts > 0,
+                                        out=np.zeros_like(counts))
+        total[position] = 0
+        positions = np.flatnonzero(total)
+        return positions.tolist(), total[positions].tolist()
+
+    def top(self, title_id, top_k):
+        """top_k пар (id похожего произведения, сходство); при равном
+        сходстве выше произведение с меньшим id."""
+        positions, values = self.scores(self.positions[title_id])
+        best = heapq.nsmallest(
+            top_k, zip((-value for value in values), positions)
+        )
+        return [(self.title_ids[pos], -value) for value, pos in best]
+
+
+def affected_titles(index, stale, top_k):
+    """Устаревшие произведения и те, чьи списки похожих могли измениться:
+    в них было устаревшее произведение или оно теперь превосходит
+    последнего из top_k. Сходство остальных пар не менялось."""
+    stored = defaultdict(list)
+    for title_id, similar_id, score in SimilarTitle.objects.values_list(
+        'title_id', 'similar_id', 'score'
+    ).iterator():
+        stored[title_id].append((similar_id, score))
+    listed_in = defaultdict(set)
+    threshold = {}
+    for title_id, neighbours in stored.items():
+        for similar_id, _ in neighbours:
+            listed_in[similar_id].add(title_id)
+        if len(neighbours) >= top_k:
+            threshold[title_id] = min(score for _, score in neighbours)
+    result = set(stale)
+    for title_id in stale:
+        result |= listed_in[title_id]
+        positions, values = index.scores(index.positions[title_id])
+        for position, value in zip(positions, values):
+            other = index.title_ids[position]
+            if value >= threshold.get(other, 0):
+                result.add(other)
+    return result
+
+
+def refresh_similar_titles(full=False, top_k=None):
+    """Пересчитывает сохранённые похожие произведения: все или только
+    затронутые изменениями с прошлого запуска. Возвращает число
+    пересчитанных произведений."""
+    top_k = top_k or settings.SIMILAR_TITLES_TOP_K
+    stale_titles = Title.objects.filter(similarity_stale=True)
+    with transaction.atomic():
+        stale = set(stale_titles.select_for_update().values_list(
+            'pk', flat=True
+        ))
+        # Сбрасываем флаг до расчёта: изменения во время расчёта
+        # снова пометят произведение.
+        stale_titles.update(similarity_stale=False)
+    if not stale and not full:
+        return 0
+    try:
+        index = SimilarityIndex.load()
+        if full:
+            targets = set(index.title_ids)
+        else:
+            targets = affected_titles(index, stale & set(index.positions),
+                                      top_k)
+        rows = [
+            SimilarTitle(title_id=title_id, similar_id=similar_id,
+                         score=score)
+            for title_id in targets
+            for similar_id, score in index.top(title_id, top_k)
+        ]
+        with transaction.atomic():
+            outdated = SimilarTitle.objects.all()
+            if not full:
+                outdated = outdated.filter(title_id__in=targets)
+            outdated.delete()
+            SimilarTitle.objects.bulk_create(rows, batch_size=1000)
+            # bulk_create не вызывает сигналы, сбрасываем кэш ответов сами.
+            transaction.on_commit(lambda: invalidate(SimilarTitle))
+    except Exception:
+        Title.objects.filter(pk__in=stale).update(similarity_stale=True)
+        raise
+    return len(targets)
@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import OutboxEmail
+
+
+def send_batch(batch_size):
+    """Отправляет пачку писем из outbox через одно соединение
+    с почтовым сервером. Возвращает (отправлено, не отправлено)."""
+    with transaction.atomic():
+        emails = list(OutboxEmail.objects.pending().select_for_update(
+            skip_locked=True
+        )[:batch_size])
+        if not emails:
+            return 0, 0
+        sent, failed = [], []
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:
+            for email in emails:
+                email.mark_failed(error)
+            failed = emails
+        else:
+            for email in emails:
+                message = EmailMessage(email.subject, email.body,
+                                       email.from_email, [email.to],
+                                       connection=connection)
+                try:
+                    message.send()
+                except Exception as error:
+                    email.mark_failed(error)
+                    failed.append(email)
+                else:
+                    email.sent_at = timezone.now()
+                    sent.append(email)
+        finally:
+            connection.close()
+        OutboxEmail.objects.bulk_update(sent, ['sent_at'])
+        OutboxEmail.objects.bulk_update(
+            failed, ['attempts', 'next_attempt_at', 'last_error']
+        )
+    return len(sent), len(failed)
+
+
+class Command(BaseCommand):
+    help = "Sends pending outbox emails in batches over one connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help='Number of emails sent over one connection'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting when it is empty'
+        )
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent + failed < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        print(f'Sent {total_sent} emails, {total_failed} failed')
@@ -1,5 +1,9 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 from .constants import ROLES, ADMIN, MODER, USER
 
@@ -20,3 +24,48 @@ class User(AbstractUser):
     @property
     def is_user(self):
         return self.role == USER
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+    def pending(self):
+        """Неотправленные письма, для которых подошло время попытки."""
+        return self.filter(
+            sent_at__isnull=True, next_attempt_at__lte=timezone.now(),
+            attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        ).order_by('id')
+
+
+class OutboxEmail(models.Model):
+    """Письмо, записанное в одной транзакции с изменением данных
+    и отправляемое командой `send_emails`."""
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.EmailField(max_length=254)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(fields=['next_attempt_at'],
+                         name='outbox_email_pending',
+                         condition=models.Q(sent_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.to}'
+
+    def mark_failed(self, error):
+        """Откладывает следующую попытку с экспоненциальной задержкой."""
+        delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** self.attempts
+        self.attempts += 1
+        self.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        self.last_error = str(error)
@@ -0,0 +1,65 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Title
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08TitleRating:
+
+    def test_01_rating_follows_reviews(self, admin_client, user_client,
+                                       moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        url = f'/api/v1/titles/{title_id}/'
+
+        create_single_review(admin_client, title_id, 'Отлично', 9)
+        response = create_single_review(user_client, title_id, 'Норм', 6)
+        review_id = response.json()['id']
+        create_single_review(moderator_client, title_id, 'Плохо', 2)
+        assert admin_client.get(url).json()['rating'] == 5, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'создании отзыва.'
+        )
+
+        response = user_client.patch(
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/',
+            data={'score': 10}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert admin_client.get(url).json()['rating'] == 7, (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'изменении оценки отзыва.'
+        )
+
+        user_client.delete(f'/api/v1/titles/{title_id}/reviews/{review_id}/')
+        title = Title.objects.get(pk=title_id)
+        assert (title.score_sum, title.review_count, title.rating) == (
+            11, 2, 5
+        ), (
+            'Проверьте, что рейтинг произведения пересчитывается при '
+            'удалении отзыва.'
+        )
+
+        assert title.average_score == 5.5, (
+            'Проверьте, что вместе с рейтингом хранится точная средняя '
+            'оценка.'
+        )
+
+        Title.objects.filter(pk=title_id).update(
+            score_sum=0, review_count=0, rating=None, average_score=None
+        )
+        call_command('recalculate_ratings')
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count, title.rating,
+                title.average_score) == (11, 2, 5, 5.5), (
+            'Проверьте, что команда `recalculate_ratings` восстанавливает '
+            'рейтинг по таблице отзывов.'
+        )
+        assert admin_client.get(
+            f'/api/v1/titles/{titles[1]["id"]}/'
+        ).json()['rating'] is None
+        assert Title.objects.get(pk=titles[1]['id']).average_score is None
@@ -0,0 +1,114 @@
+import pytest
+from rest_framework.pagination import PageNumberPagination
+
+from reviews.models import Genre, Title
+from tests.utils import create_catalog
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09QueryCount:
+
+    def test_01_comment_list_queries(self, client, django_user_model,
+                                     django_assert_num_queries):
+        title, reviews = create_catalog(django_user_model, reviews_count=10)
+        url = f'/api/v1/titles/{title.id}/reviews/{reviews[0].id}/comments/'
+
+        # Проверка отзыва, COUNT и страница комментариев с авторами.
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert len(response.json()['results']) == 1
+
+        with django_assert_num_queries(1):
+            response = client.get(
+                f'/api/v1/titles/{title.id + 1}/reviews/{reviews[0].id}/'
+                'comments/'
+            )
+        assert response.status_code == 404, (
+            'Проверьте, что запрос комментариев к отзыву другого '
+            'произведения возвращает ответ со статусом 404.'
+        )
+
+    def test_02_title_list_queries(self, client, django_user_model,
+                                   django_assert_num_queries):
+        title, _ = create_catalog(django_user_model, reviews_count=0)
+        genres = [
+            Genre.objects.create(name=f'Жанр {idx}', slug=f'genre{idx}')
+            for idx in range(3)
+        ]
+        for idx in range(10):
+            extra = Title.objects.create(
+                name=f'Произведение {idx}', year=2000,
+                category=title.category
+            )
+            extra.genre.set(genres)
+
+        # COUNT, страница произведений с категорией и жанры одним запросом.
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == 5
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{extra.id}/')
+        assert len(response.json()['genre']) == 3, (
+            'Проверьте, что произведения отдаются вместе с категорией '
+            'и жанрами за фиксированное число запросов к БД.'
+        )
+
+    @pytest.mark.parametrize('page_size', (5, 50, 500))
+    def test_03_review_list_queries(self, client, django_user_model,
+                                    django_assert_num_queries, monkeypatch,
+                                    page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title, _ = create_catalog(django_user_model,
+                                  reviews_count=page_size, comments_count=0)
+
+        # Произведение, COUNT и страница отзывов с авторами.
+        with django_assert_num_queries(3):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert len(response.json()['results']) == page_size, (
+            'Проверьте, что авторы отзывов загружаются вместе с отзывами, '
+            'а не отдельным запросом на каждый отзыв.'
+        )
+
+    @pytest.mark.parametrize('page_size', (5, 50, 500))
+    def test_04_comment_list_author_queries(self, client, django_user_model,
+                                            django_assert_num_queries,
+                                            monkeypatch, page_size):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', page_size)
+        title, reviews = create_catalog(django_user_model, reviews_count=1,
+                                        comments_count=page_size)
+        url = f'/api/v1/titles/{title.id}/reviews/{reviews[0].id}/comments/'
+
+        with django_assert_num_queries(3):
+            response = client.get(url)
+        assert len(response.json()['results']) == page_size, (
+            'Проверьте, что авторы комментариев загружаются вместе с '
+            'комментариями, а не отдельным запросом на каждый комментарий.'
+        )
+
+    def test_05_signup_queries(self, client, django_user_model,
+                               django_assert_num_queries):
+        url = '/api/v1/auth/signup/'
+        data = {'email': 'new@yamdb.fake', 'username': 'new_user'}
+
+        # Поиск по email или username, затем в транзакции (BEGIN):
+        # INSERT пользователя, код подтверждения и письмо в outbox.
+        with django_assert_num_queries(5):
+            response = client.post(url, data=data)
+        assert response.status_code == 200
+        with django_assert_num_queries(4):
+            response = client.post(url, data=data)
+        assert response.status_code == 200, (
+            'Проверьте, что повторная регистрация ищет пользователя одним '
+            'запросом и обновляет код подтверждения одним UPDATE.'
+        )
+        user = django_user_model.objects.get(username='new_user')
+        assert user.confirmation_code
+
+        with django_assert_num_queries(1):
+            response = client.post(url, data={'email': 'new@yamdb.fake',
+                                              'username': 'other'})
+        assert response.status_code == 400
+        with django_assert_num_queries(1):
+            response = client.post(url, data={'email': 'other@yamdb.fake',
+                                              'username': 'new_user'})
+        assert response.status_code == 400
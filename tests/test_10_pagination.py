@@ -0,0 +1,138 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reviews.models import Review, Title
+from tests.utils import create_catalog
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10CursorPagination:
+
+    def collect_pages(self, client, url):
+        results = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что при `?pagination=cursor` ответ не содержит '
+                'ключ `count`.'
+            )
+            results.extend(data['results'])
+            url = data['next']
+        return results
+
+    def test_01_reviews_and_comments_cursor(self, client, django_user_model):
+        title, reviews = create_catalog(django_user_model, reviews_count=12,
+                                        comments_count=7)
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        results = self.collect_pages(client, url)
+        assert [review['id'] for review in results] == [
+            review.id for review in sorted(
+                reviews, key=lambda review: (review.pub_date, review.id),
+                reverse=True
+            )
+        ], (
+            'Проверьте, что keyset-пагинация отзывов проходит все отзывы '
+            'в порядке убывания `pub_date` без повторов и пропусков.'
+        )
+
+        url = (f'/api/v1/titles/{title.id}/reviews/{reviews[0].id}/'
+               'comments/?pagination=cursor')
+        assert len({
+            comment['id'] for comment in self.collect_pages(client, url)
+        }) == 7
+
+    def test_02_titles_cursor(self, client, django_user_model):
+        title, _ = create_catalog(django_user_model, reviews_count=0)
+        response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что по умолчанию используется постраничная пагинация.'
+        )
+        results = self.collect_pages(
+            client, '/api/v1/titles/?pagination=cursor'
+        )
+        assert [item['id'] for item in results] == [title.id]
+
+    def test_03_cached_count(self, client, user_client, django_user_model,
+                             django_assert_num_queries):
+        title, _ = create_catalog(django_user_model, reviews_count=6)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.get(url)
+        assert response.json()['count'] == 6
+        assert response.json()['count_exact'] is True, (
+            'Проверьте, что ответ содержит ключ `count_exact`.'
+        )
+
+        # Произведение и страница отзывов, COUNT берётся из кэша.
+        with django_assert_num_queries(2):
+            client.get(url)
+
+        response = user_client.post(url, data={'text': 'Новый', 'score': 3})
+        assert response.status_code == HTTPStatus.CREATED
+        assert client.get(url).json()['count'] == 7, (
+            'Проверьте, что закэшированное количество сбрасывается '
+            'при создании объекта.'
+        )
+
+    def test_04_cached_count_subquery(self, client, django_user_model):
+        title, _ = create_catalog(django_user_model, reviews_count=0)
+        other = Title.objects.create(name='Чужой', year=1979,
+                                     category=title.category)
+        url = '/api/v1/titles/'
+        response = client.get(url, {'genre': 'drama'})
+        assert response.json()['count'] == 1
+
+        other.genre.add(*title.genre.all())
+        data = client.get(url, {'genre': 'drama'}).json()
+        assert data['count'] == 2, (
+            'Проверьте, что закэшированное количество сбрасывается при '
+            'изменении таблиц из подзапросов фильтра.'
+        )
+        assert [item['id'] for item in data['results']] == [
+            title.id, other.id
+        ]
+
+    def test_05_cursor_ties(self, client, django_user_model):
+        title, reviews = create_catalog(django_user_model, reviews_count=12,
+                                        comments_count=0)
+        now = timezone.now()
+        Review.objects.filter(id__in=[r.id for r in reviews[:7]]).update(
+            pub_date=now
+        )
+        Review.objects.filter(id__in=[r.id for r in reviews[7:]]).update(
+            pub_date=now - timezone.timedelta(days=1)
+        )
+        expected = list(Review.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        with CaptureQueriesContext(connection) as context:
+            results = self.collect_pages(client, url)
+        assert [review['id'] for review in results] == expected, (
+            'Проверьте, что keyset-пагинация отзывов с одинаковой `pub_date` '
+            'проходит их в порядке убывания `id`.'
+        )
+        assert not any('OFFSET' in query['sql']
+                       for query in context.captured_queries), (
+            'Проверьте, что keyset-пагинация выбирает страницу условием '
+            'по `(pub_date, id)`, без OFFSET.'
+        )
+
+        data = client.get(url).json()
+        while data['next']:
+            data = client.get(data['next']).json()
+        pages = [[review['id'] for review in data['results']]]
+        while data['previous']:
+            data = client.get(data['previous']).json()
+            pages.insert(0, [review['id'] for review in data['results']])
+        assert sum(pages, []) == expected, (
+            'Проверьте, что ссылки `previous` проходят отзывы в обратную '
+            'сторону без повторов и пропусков.'
+        )
+        response = client.get(url, {'cursor': 'cD1ub3QtanNvbg=='})
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,124 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import transaction
+
+from api.caching import get_versions
+from reviews.models import Review, Title
+from tests.utils import create_catalog, create_single_review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11ResponseCache:
+
+    def test_01_titles_cache(self, client, admin_client, user_client,
+                             django_user_model, django_assert_num_queries):
+        title, _ = create_catalog(django_user_model, reviews_count=0)
+        url = f'/api/v1/titles/{title.id}/'
+        assert client.get(url).json()['rating'] is None
+        client.get('/api/v1/titles/')
+
+        with django_assert_num_queries(0):
+            assert client.get(url).status_code == HTTPStatus.OK
+            client.get('/api/v1/titles/')
+
+        create_single_review(user_client, title.id, 'Отлично', 8)
+        assert client.get(url).json()['rating'] == 8, (
+            'Проверьте, что кэш произведения сбрасывается при создании '
+            'отзыва и рейтинг не устаревает.'
+        )
+
+        admin_client.post('/api/v1/genres/', data={'name': 'Ужасы',
+                                                   'slug': 'horror'})
+        admin_client.patch(url, data={'genre': ['horror']})
+        data = client.get('/api/v1/titles/').json()['results'][0]
+        assert [genre['slug'] for genre in data['genre']] == ['horror'], (
+            'Проверьте, что кэш списка произведений сбрасывается при '
+            'изменении жанров произведения.'
+        )
+
+    def test_02_genres_cache(self, client, admin_client,
+                             django_assert_num_queries):
+        client.get('/api/v1/genres/')
+        with django_assert_num_queries(0):
+            client.get('/api/v1/genres/')
+        admin_client.post('/api/v1/genres/', data={'name': 'Ужасы',
+                                                   'slug': 'horror'})
+        assert client.get('/api/v1/genres/').json()['count'] == 1
+        assert client.get('/api/v1/genres/?search=xyz').json()['count'] == 0
+
+    def test_03_version_bumped_on_commit(self, client, user,
+                                         django_user_model):
+        title, _ = create_catalog(django_user_model, reviews_count=0)
+        url = f'/api/v1/titles/{title.id}/'
+        etag = client.get(url)['ETag']
+        with transaction.atomic():
+            Review.objects.create(title=title, author=user, text='Текст',
+                                  score=9)
+            # Так видит версии параллельный запрос, читающий данные
+            # до фиксации транзакции.
+            during = get_versions([Review])
+        assert get_versions([Review]) != during, (
+            'Проверьте, что версия кэша меняется после фиксации транзакции, '
+            'и ответ, прочитанный до неё, не будет отдан из кэша.'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.json()['rating'] == 9
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11ConditionalGet:
+
+    def test_01_review_etag(self, client, user_client, django_user_model,
+                            django_assert_num_queries):
+        title, reviews = create_catalog(django_user_model, reviews_count=2)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag and response['Last-Modified'], (
+            'Проверьте, что ответ на GET-запрос содержит заголовки `ETag` '
+            'и `Last-Modified`.'
+        )
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что при совпадении `If-None-Match` возвращается '
+            'ответ со статусом 304 без обращения к БД.'
+        )
+        response = client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+        create_single_review(user_client, title.id, 'Новый', 7)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения отзывов `ETag` меняется.'
+        )
+        assert response['ETag'] != etag
+
+    def test_02_etag_follows_parent(self, client, admin_client,
+                                    django_user_model):
+        title, reviews = create_catalog(django_user_model, reviews_count=2,
+                                        comments_count=0)
+        url = f'/api/v1/titles/{title.id}/reviews/{reviews[0].id}/comments/'
+        etag = client.get(url)['ETag']
+        admin_client.delete(f'/api/v1/titles/{title.id}/reviews/'
+                            f'{reviews[0].id}/')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что после удаления отзыва список его комментариев '
+            'не отдаётся по старому `ETag`.'
+        )
+
+        other = Title.objects.create(name='Чужой', year=1979,
+                                     category=title.category)
+        url = f'/api/v1/titles/{other.id}/reviews/'
+        etag = client.get(url)['ETag']
+        admin_client.delete(f'/api/v1/titles/{other.id}/')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что после удаления произведения список его отзывов '
+            'не отдаётся по старому `ETag`.'
+        )
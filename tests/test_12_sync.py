@@ -0,0 +1,146 @@
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from reviews.models import (Change, Comment, Review, SearchDocument,
+                            Tombstone)
+from tests.utils import create_catalog, create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12DeltaSync:
+
+    def test_01_changed_since(self, client, admin_client, django_user_model):
+        title, reviews = create_catalog(django_user_model, reviews_count=3)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        since = timezone.now().isoformat()
+
+        response = admin_client.patch(f'{url}{reviews[1].id}/',
+                                      data={'text': 'Изменён'})
+        assert response.status_code == HTTPStatus.OK
+        admin_client.delete(f'{url}{reviews[2].id}/')
+
+        response = client.get(url, {'changed_since': since})
+        assert [review['id'] for review in response.json()['results']] == [
+            reviews[1].id
+        ], (
+            'Проверьте, что `?changed_since=` возвращает только отзывы, '
+            'изменённые после указанного момента.'
+        )
+        response = client.get('/api/v1/titles/', {'changed_since': since})
+        assert [item['id'] for item in response.json()['results']] == [
+            title.id
+        ], (
+            'Проверьте, что изменение оценок отзывов отмечает произведение '
+            'изменённым.'
+        )
+
+        response = client.get(
+            '/api/v1/deleted/', {'changed_since': since, 'model': 'review'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert [
+            (item['model'], item['object_id'])
+            for item in response.json()['results']
+        ] == [('review', reviews[2].id)], (
+            'Проверьте, что удалённые отзывы отдаются через '
+            '`/api/v1/deleted/`.'
+        )
+        assert not Review.objects.filter(pk=reviews[2].id).exists()
+
+    def test_02_changed_since_invalid(self, client):
+        response = client.get('/api/v1/genres/', {'changed_since': 'вчера'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что некорректное значение `changed_since` '
+            'возвращает ответ со статусом 400.'
+        )
+
+    def test_03_cascade_delete(self, admin_client, django_user_model,
+                               django_assert_max_num_queries):
+        title, reviews = create_catalog(django_user_model, reviews_count=50,
+                                        comments_count=3)
+        comments = set(Comment.objects.values_list('pk', flat=True))
+        review = reviews[0]
+        response = admin_client.delete(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+        with django_assert_max_num_queries(50):
+            response = admin_client.delete(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT, (
+            'Проверьте, что отзывы и комментарии удаляемого произведения '
+            'удаляются пачками, а не запросом на каждую строку.'
+        )
+        for model, expected in (('title', {title.id}),
+                                ('review', {item.id for item in reviews}),
+                                ('comment', comments)):
+            assert set(Tombstone.objects.filter(model=model).values_list(
+                'object_id', flat=True
+            )) == expected, (
+                'Проверьте, что при удалении произведения остаются '
+                'надгробия его отзывов и комментариев.'
+            )
+            assert set(Change.objects.filter(
+                model=model, action=Change.DELETED
+            ).values_list('object_id', flat=True)) == expected
+        assert not Comment.objects.exists()
+        assert not SearchDocument.objects.exists()
+
+    def test_04_change_feed(self, client, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get('/api/v1/changes/', {'limit': 1})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert [
+            (item['model'], item['object_id'], item['action'])
+            for item in data['results']
+        ] == [('title', titles[0]['id'], 'created')]
+
+        review = create_single_review(
+            user_client, titles[0]['id'], 'Текст', 6
+        ).json()
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        changes = []
+        url = data['next']
+        while True:
+            data = client.get(url).json()
+            if not data['results']:
+                break
+            changes.extend(data['results'])
+            url = data['next']
+        assert [
+            (item['model'], item['object_id'], item['action'])
+            for item in changes
+        ] == [
+            ('title', titles[1]['id'], 'created'),
+            ('review', review['id'], 'created'),
+            ('review', review['id'], 'deleted'),
+            ('title', titles[0]['id'], 'deleted'),
+        ], (
+            'Проверьте, что `/api/v1/changes/` отдаёт изменения произведений '
+            'и отзывов по порядку и позволяет дочитать ленту по `next`.'
+        )
+        assert client.get(url).json()['next'] == url, (
+            'Проверьте, что в конце ленты `next` указывает на ту же позицию.'
+        )
+
+    def test_05_change_feed_cursor(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        data = client.get('/api/v1/changes/', {'limit': 1}).json()
+        first = Change.objects.get(model='title', object_id=titles[0]['id'])
+        assert f'after={first.txid}-{first.id}' in data['next'], (
+            'Проверьте, что курсор ленты — пара `<txid>-<id>` последней '
+            'отданной записи.'
+        )
+        assert [item['object_id'] for item in client.get(
+            '/api/v1/changes/', {'after': f'{first.txid}-{first.id}'}
+        ).json()['results']] == [titles[1]['id']]
+
+        for cursor in ('5', 'abc', '1-2-3'):
+            response = client.get('/api/v1/changes/', {'after': cursor})
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                'Проверьте, что при некорректном курсоре `/api/v1/changes/` '
+                'возвращает ответ со статусом 400.'
+            )
@@ -0,0 +1,61 @@
+import pytest
+
+from tests.utils import create_single_review, create_titles
+
+
+def title_ids(response):
+    return sorted(title['id'] for title in response.json()['results'])
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13TitleFilter:
+
+    def test_01_slug_filters(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = '/api/v1/titles/'
+
+        assert title_ids(client.get(url, {'genre': 'comedy'})) == [
+            titles[0]['id']
+        ]
+        assert title_ids(client.get(url, {'genre': 'com'})) == [], (
+            'Проверьте, что фильтр `genre` ищет по точному slug.'
+        )
+        assert title_ids(client.get(url, {'genre_contains': 'com'})) == [
+            titles[0]['id']
+        ], (
+            'Проверьте, что поиск по подстроке slug доступен через '
+            '`genre_contains`.'
+        )
+        assert title_ids(client.get(url, {'genre': 'comedy,drama'})) == [
+            titles[0]['id'], titles[1]['id']
+        ], (
+            'Проверьте, что фильтр `genre` принимает несколько slug через '
+            'запятую.'
+        )
+        assert title_ids(client.get(url, {'category': 'books'})) == [
+            titles[1]['id']
+        ]
+        assert title_ids(client.get(url, {'category': 'unknown'})) == []
+        assert title_ids(client.get(url, {'category_contains': 'o'})) == [
+            titles[1]['id']
+        ]
+
+    def test_02_multi_genre_titles(self, client, admin_client, user_client,
+                                   moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        create_single_review(user_client, title_id, 'Хорошо', 8)
+        create_single_review(moderator_client, title_id, 'Так себе', 4)
+        url = '/api/v1/titles/'
+
+        for params in ({'genre': 'horror,comedy'}, {'genre_contains': 'o'}):
+            data = client.get(url, params).json()
+            assert [title['id'] for title in data['results']] == [
+                title_id
+            ] and data['count'] == 1, (
+                'Проверьте, что произведение с несколькими подходящими '
+                'жанрами возвращается один раз.'
+            )
+            assert data['results'][0]['rating'] == 6, (
+                'Проверьте, что фильтр по жанрам не искажает рейтинг.'
+            )
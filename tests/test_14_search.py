@@ -0,0 +1,75 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import SearchDocument
+from tests.utils import create_single_review, create_titles
+
+
+def found(response):
+    return [(item['type'], item['id']) for item in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14Search:
+    url = '/api/v1/search/'
+
+    def test_01_search(self, client, admin_client, user_client,
+                       moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(
+            user_client, titles[1]['id'], 'Орешек крепче терминатора', 9
+        ).json()
+        create_single_review(
+            moderator_client, titles[1]['id'], 'Скучно', 3
+        )
+
+        response = client.get(self.url, {'q': 'терминатор'})
+        assert response.status_code == HTTPStatus.OK
+        assert found(response) == [('title', titles[0]['id'])], (
+            'Проверьте, что `/api/v1/search/` ищет по названию '
+            'произведения без учёта регистра.'
+        )
+        assert found(client.get(self.url, {'q': 'ki yay'})) == [
+            ('title', titles[1]['id'])
+        ], 'Проверьте, что поиск идёт по описанию произведения.'
+        data = client.get(self.url, {'q': 'орешек'}).json()
+        assert {(item['type'], item['id']) for item in data['results']} == {
+            ('title', titles[1]['id']), ('review', review['id'])
+        } and data['count'] == 2, (
+            'Проверьте, что поиск идёт по текстам отзывов.'
+        )
+        assert data['results'][0]['rank'] >= data['results'][1]['rank']
+        assert found(client.get(self.url, {'q': 'орешек скучно'})) == []
+
+    def test_02_index_sync(self, client, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(
+            user_client, titles[0]['id'], 'Жуткий фильм', 8
+        ).json()
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/'
+
+        user_client.patch(url, data={'text': 'Смешной фильм'})
+        assert found(client.get(self.url, {'q': 'жуткий'})) == []
+        assert found(client.get(self.url, {'q': 'смешной'})) == [
+            ('review', review['id'])
+        ], 'Проверьте, что индекс обновляется при изменении отзыва.'
+
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/',
+                           data={'name': 'Чужой'})
+        assert found(client.get(self.url, {'q': 'чужой'})) == [
+            ('title', titles[0]['id'])
+        ], 'Проверьте, что индекс обновляется при изменении произведения.'
+
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert found(client.get(self.url, {'q': 'фильм чужой'})) == []
+        assert not SearchDocument.objects.filter(
+            title_id=titles[0]['id']
+        ).exists()
+        assert SearchDocument.objects.rebuild() == 1
+
+    def test_03_search_invalid(self, client):
+        assert client.get(self.url).status_code == HTTPStatus.BAD_REQUEST
+        response = client.get(self.url, {'q': '"*^('})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 0
@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import transaction
+
+from api.caching import invalidate
+from reviews.models import Category, Title
+from tests.utils import create_titles
+
+
+def names(response):
+    return [item['name'] for item in response.json()]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15Autocomplete:
+    url = '/api/v1/titles/autocomplete/'
+
+    def test_01_autocomplete(self, client, admin_client,
+                             django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        response = client.get(self.url, {'q': 'Тер'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == [
+            {'id': titles[0]['id'], 'name': 'Терминатор'}
+        ], (
+            'Проверьте, что подсказки ищут название по префиксу без учёта '
+            'регистра.'
+        )
+        with django_assert_num_queries(0):
+            assert names(client.get(self.url, {'q': 'ОРЕ'})) == [
+                'Крепкий орешек'
+            ], (
+                'Проверьте, что подсказки находят начало любого слова '
+                'названия и не обращаются к БД.'
+            )
+        assert names(client.get(self.url, {'q': 'к'})) == ['Крепкий орешек']
+
+    def test_02_index_updates(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        client.get(self.url, {'q': 'т'})
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/',
+                           data={'name': 'Терминатор 2'})
+        admin_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Титаник', 'year': 1997, 'category': 'films',
+            'genre': ['drama'],
+        })
+        assert names(client.get(self.url, {'q': 'т'})) == [
+            'Терминатор 2', 'Титаник'
+        ], (
+            'Проверьте, что индекс подсказок обновляется при изменении, '
+            'удалении и создании произведений.'
+        )
+        assert names(client.get(self.url, {'q': 'т', 'limit': 1})) == [
+            'Терминатор 2'
+        ]
+        assert names(client.get(self.url, {'q': 'крепкий'})) == []
+
+    def test_03_autocomplete_invalid(self, client):
+        assert client.get(self.url).status_code == HTTPStatus.BAD_REQUEST
+        response = client.get(self.url, {'q': 'a', 'limit': 0})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_04_rollback_and_other_process(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        client.get(self.url, {'q': 'т'})
+        with transaction.atomic():
+            Title.objects.create(name='Призрак', year=1990,
+                                 category_id=Category.objects.first().id)
+            transaction.set_rollback(True)
+        assert names(client.get(self.url, {'q': 'приз'})) == [], (
+            'Проверьте, что откаченное сохранение не попадает в индекс.'
+        )
+
+        # Переименование в другом процессе: сигналы здесь не вызываются,
+        # меняется только общая версия модели.
+        Title.objects.filter(pk=titles[0]['id']).update(name='Робокоп')
+        invalidate(Title)
+        assert names(client.get(self.url, {'q': 'роб'})) == ['Робокоп'], (
+            'Проверьте, что индекс перестраивается при смене версии '
+            '`Title` в кэше.'
+        )
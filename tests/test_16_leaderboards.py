@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_single_review, create_titles
+
+
+def ids(response):
+    assert response.status_code == HTTPStatus.OK
+    return [title['id'] for title in response.json()]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16Leaderboards:
+    top_rated = '/api/v1/titles/top-rated/'
+    most_reviewed = '/api/v1/titles/most-reviewed/'
+
+    def test_01_leaderboards(self, client, admin_client, user_client,
+                             moderator_client, django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        for author, score in ((user_client, 10), (moderator_client, 8),
+                              (admin_client, 6)):
+            create_single_review(author, first, 'Текст', score)
+        for author in (user_client, moderator_client):
+            create_single_review(author, second, 'Текст', 9)
+
+        assert ids(client.get(self.top_rated)) == [first], (
+            'Проверьте, что в рейтинг не попадают произведения с числом '
+            'отзывов меньше порогового.'
+        )
+        assert ids(client.get(self.top_rated, {'min_reviews': 1})) == [
+            second, first
+        ], 'Проверьте, что рейтинг упорядочен по убыванию оценки.'
+        assert ids(client.get(
+            self.top_rated, {'min_reviews': 1, 'genre': 'drama'}
+        )) == [second]
+        assert ids(client.get(
+            self.top_rated, {'min_reviews': 1, 'category': 'films'}
+        )) == [first]
+        data = client.get(self.most_reviewed).json()
+        assert [(title['id'], title['review_count']) for title in data] == [
+            (first, 3), (second, 2)
+        ], 'Проверьте, что рейтинг отзывов упорядочен по их числу.'
+        assert ids(client.get(self.most_reviewed, {'limit': 1})) == [first]
+
+        with django_assert_num_queries(0):
+            client.get(self.top_rated)
+
+        create_single_review(admin_client, second, 'Текст', 9)
+        assert ids(client.get(self.top_rated)) == [second, first], (
+            'Проверьте, что рейтинг обновляется после нового отзыва.'
+        )
+
+    def test_02_leaderboard_invalid(self, client):
+        response = client.get(self.top_rated, {'min_reviews': 0})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.get(self.most_reviewed, {'limit': 1000})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_03_top_rated_exact_average(self, client, admin_client,
+                                        user_client, moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        reviews = {}
+        for author, scores in ((user_client, (9, 10)),
+                               (moderator_client, (9, 10)),
+                               (admin_client, (9, 9))):
+            for title, score in zip((first, second), scores):
+                reviews[author, title] = create_single_review(
+                    author, title, 'Текст', score
+                ).json()['id']
+
+        assert ids(client.get(self.top_rated)) == [second, first], (
+            'Проверьте, что рейтинг упорядочен по точной средней оценке, '
+            'а не по округлённой: 9.67 выше 9.0.'
+        )
+        admin_client.delete(
+            f'/api/v1/titles/{second}/reviews/'
+            f'{reviews[user_client, second]}/'
+        )
+        assert ids(client.get(self.top_rated, {'min_reviews': 1})) == [
+            second, first
+        ]
+        admin_client.delete(
+            f'/api/v1/titles/{second}/reviews/'
+            f'{reviews[moderator_client, second]}/'
+        )
+        assert ids(client.get(self.top_rated, {'min_reviews': 1})) == [
+            first, second
+        ], 'Проверьте, что средняя оценка обновляется при удалении отзыва.'
@@ -0,0 +1,95 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import SimilarTitle
+from reviews.similarity import SimilarityIndex, refresh_similar_titles
+from tests.utils import create_single_review, create_titles
+
+
+def similar(client, title_id):
+    response = client.get(f'/api/v1/titles/{title_id}/similar/')
+    assert response.status_code == HTTPStatus.OK
+    return [(title['id'], round(title['similarity'], 4))
+            for title in response.json()]
+
+
+def stored():
+    return set(SimilarTitle.objects.values_list('title_id', 'similar_id',
+                                                'score'))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17SimilarTitles:
+
+    def test_01_similar(self, client, admin_client, user_client,
+                        moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]['id'], titles[1]['id']
+        third = admin_client.post('/api/v1/titles/', data={
+            'name': 'Маска', 'year': 1994, 'category': 'films',
+            'genre': ['comedy', 'drama'],
+        }).json()['id']
+        create_single_review(user_client, first, 'Текст', 5)
+        create_single_review(user_client, third, 'Текст', 5)
+        create_single_review(moderator_client, third, 'Текст', 5)
+        create_single_review(moderator_client, second, 'Текст', 5)
+
+        assert refresh_similar_titles() == 3
+        assert similar(client, third) == [(second, 0.75), (first, 0.5833)], (
+            'Проверьте, что похожие произведения упорядочены по сходству '
+            'жанров и авторов отзывов.'
+        )
+        assert similar(client, first) == [(third, 0.5833)]
+        assert refresh_similar_titles() == 0
+
+        admin_client.patch(f'/api/v1/titles/{second}/',
+                           data={'genre': ['horror', 'comedy']})
+        assert refresh_similar_titles() == 3
+        assert similar(client, first) == [(second, 1.0), (third, 0.5833)], (
+            'Проверьте, что похожие пересчитываются после изменения жанров.'
+        )
+        incremental = stored()
+        refresh_similar_titles(full=True)
+        assert stored() == incremental, (
+            'Проверьте, что инкрементальный пересчёт совпадает с полным.'
+        )
+
+        admin_client.delete(f'/api/v1/titles/{second}/')
+        assert refresh_similar_titles() == 2
+        assert similar(client, first) == [(third, 0.5833)]
+
+    def test_02_refresh_invalidates_cache(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/similar/'
+        etag = client.get(url)['ETag']
+        assert client.get(url).json() == []
+        admin_client.patch(f'/api/v1/titles/{titles[1]["id"]}/',
+                           data={'genre': ['horror']})
+        client.get(url)
+        refresh_similar_titles()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert [title['id'] for title in response.json()] == [
+            titles[1]['id']
+        ], (
+            'Проверьте, что пересчёт похожих сбрасывает кэш ответов.'
+        )
+
+    def test_03_similar_not_found(self, client):
+        response = client.get('/api/v1/titles/1/similar/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_similarity_index_top():
+    index = SimilarityIndex(
+        [1, 2, 3, 4],
+        [(1, 'a'), (1, 'b'), (2, 'a'), (2, 'b'), (3, 'a'), (4, 'c')],
+        [(1, 10), (3, 10), (4, 11)],
+        author_weight=0.5,
+    )
+    assert index.top(1, 2) == [(2, 1.0), (3, 1.0)], (
+        'Проверьте, что при равном сходстве выше произведение с меньшим id.'
+    )
+    assert index.top(1, 1) == [(2, 1.0)]
+    assert index.top(4, 3) == []
@@ -0,0 +1,81 @@
+from smtplib import SMTPException
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from users.models import OutboxEmail
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException('Сервер недоступен')
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+
+
+def signup(client, idx):
+    return client.post('/api/v1/auth/signup/', data={
+        'email': f'user{idx}@yamdb.fake', 'username': f'user{idx}'
+    })
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18EmailOutbox:
+
+    def test_01_signup_uses_outbox(self, client, settings):
+        settings.EMAIL_BACKEND = 'tests.test_18_outbox.CountingBackend'
+        CountingBackend.opened = 0
+        for idx in range(3):
+            signup(client, idx)
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не отправляет письмо сама, а '
+            'записывает его в outbox.'
+        )
+        assert OutboxEmail.objects.pending().count() == 3
+
+        call_command('send_emails', batch_size=2)
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            f'user{idx}@yamdb.fake' for idx in range(3)
+        ]
+        assert CountingBackend.opened == 2, (
+            'Проверьте, что пачка писем отправляется через одно соединение.'
+        )
+        assert not OutboxEmail.objects.pending().exists()
+        call_command('send_emails')
+        assert len(mail.outbox) == 3
+
+    def test_02_retry_with_backoff(self, client, settings):
+        settings.EMAIL_BACKEND = 'tests.test_18_outbox.FailingBackend'
+        signup(client, 1)
+        call_command('send_emails')
+        email = OutboxEmail.objects.get()
+        assert email.sent_at is None and email.attempts == 1
+        assert email.next_attempt_at > timezone.now(), (
+            'Проверьте, что неудачная отправка откладывается.'
+        )
+        assert 'Сервер недоступен' in email.last_error
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        call_command('send_emails')
+        assert len(mail.outbox) == 0
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('send_emails')
+        assert len(mail.outbox) == 1
+        assert OutboxEmail.objects.get().sent_at is not None
+
+        OutboxEmail.objects.update(
+            sent_at=None, attempts=settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        )
+        assert not OutboxEmail.objects.pending().exists(), (
+            'Проверьте, что после последней попытки письмо больше не '
+            'отправляется.'
+        )
@@ -0,0 +1,74 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.throttling import SlidingWindowThrottle
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_020.0]
+    monkeypatch.setattr(SlidingWindowThrottle, 'timer', lambda self: now[0])
+    return now
+
+
+def rates(monkeypatch, **rates):
+    monkeypatch.setattr(SlidingWindowThrottle, 'THROTTLE_RATES', rates)
+
+
+def signup(client, email, username):
+    return client.post('/api/v1/auth/signup/',
+                       data={'email': email, 'username': username})
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19Throttling:
+
+    def test_01_signup_email_throttle(self, client, monkeypatch, clock,
+                                      django_assert_num_queries):
+        rates(monkeypatch, signup_email='2/min', signup_ip='4/min')
+        for _ in range(2):
+            response = signup(client, 'user@yamdb.fake', 'user')
+            assert response.status_code == HTTPStatus.OK
+        with django_assert_num_queries(0):
+            response = signup(client, 'USER@yamdb.fake', 'other')
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что регистрация ограничена по email и отклонённый '
+            'запрос не обращается к БД.'
+        )
+        assert int(response['Retry-After']) > 0
+        assert signup(
+            client, 'other@yamdb.fake', 'other'
+        ).status_code == HTTPStatus.OK
+        response = signup(client, 'third@yamdb.fake', 'third')
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            'Проверьте, что регистрация ограничена по IP-адресу.'
+        )
+
+    def test_02_sliding_window(self, client, monkeypatch, clock):
+        rates(monkeypatch, signup_username='2/min')
+        for _ in range(2):
+            signup(client, 'user@yamdb.fake', 'user')
+        clock[0] += 30
+        assert signup(
+            client, 'user@yamdb.fake', 'user'
+        ).status_code == HTTPStatus.TOO_MANY_REQUESTS
+        clock[0] += 60
+        assert signup(
+            client, 'user@yamdb.fake', 'user'
+        ).status_code == HTTPStatus.OK, (
+            'Проверьте, что запросы прошлого окна учитываются с весом '
+            'оставшейся доли окна.'
+        )
+        assert signup(
+            client, 'user@yamdb.fake', 'user'
+        ).status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+    def test_03_token_username_throttle(self, client, monkeypatch, clock,
+                                        user):
+        rates(monkeypatch, token_username='1/min')
+        data = {'username': user.username, 'confirmation_code': 'wrong'}
+        response = client.post('/api/v1/auth/token/', data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = client.post('/api/v1/auth/token/', data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
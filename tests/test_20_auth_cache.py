@@ -0,0 +1,52 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20CachedAuthentication:
+
+    def test_01_no_user_query(self, user_client, django_assert_num_queries):
+        user_client.get('/api/v1/genres/')
+        with django_assert_num_queries(0):
+            response = user_client.get('/api/v1/genres/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что аутентифицированный запрос берёт пользователя '
+            'из кэша, а не из БД.'
+        )
+
+    def test_02_role_change(self, admin_client, user_client, moderator,
+                            moderator_client):
+        titles, _, _ = create_titles(admin_client)
+        review = create_single_review(
+            user_client, titles[0]['id'], 'Текст', 5
+        ).json()
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/{review["id"]}/'
+        moderator_client.get('/api/v1/genres/')
+        admin_client.patch(f'/api/v1/users/{moderator.username}/',
+                           data={'role': 'user'})
+        response = moderator_client.patch(url, data={'text': 'Изменён'})
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            'Проверьте, что кэш пользователя сбрасывается при изменении '
+            'его роли.'
+        )
+
+        moderator.is_active = False
+        moderator.save()
+        response = moderator_client.get('/api/v1/users/me/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_03_me_full_profile(self, user_client, user):
+        user_client.get('/api/v1/genres/')
+        response = user_client.patch('/api/v1/users/me/',
+                                     data={'bio': 'Новое'})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data['email'] == user.email and data['bio'] == 'Новое', (
+            'Проверьте, что `/users/me/` читает и сохраняет полный профиль, '
+            'а не кэшированную копию пользователя.'
+        )
+        user.refresh_from_db()
+        assert user.email and user.bio == 'Новое'
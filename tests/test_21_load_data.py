@@ -0,0 +1,305 @@
+import csv
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from api.authentication import snapshot_key
+from reviews.management.commands import dump_data
+from reviews.management.commands.load_data import (FILES, MODELS,
+                                                   dependency_levels)
+from reviews.models import (Category, Change, ChangeQuerySet, Comment, Genre,
+                            Review, Title, Tombstone, User)
+
+DATA = {
+    'users.csv': [
+        ('id', 'username', 'email', 'role', 'bio', 'first_name',
+         'last_name'),
+        (100, 'reader', 'reader@yamdb.fake', 'user', '', '', ''),
+        (101, 'critic', 'critic@yamdb.fake', 'moderator', '', '', ''),
+        (102, 'viewer', 'viewer@yamdb.fake', 'user', '', '', ''),
+    ],
+    'category.csv': [
+        ('id', 'name', 'slug'),
+        (1, 'Фильм', 'movie'),
+        (2, 'Книга', 'book'),
+    ],
+    'genre.csv': [
+        ('id', 'name', 'slug'),
+        (1, 'Драма', 'drama'),
+        (2, 'Комедия', 'comedy'),
+    ],
+    'titles.csv': [
+        ('id', 'name', 'year', 'category_id'),
+        (1, 'Побег из Шоушенка', 1994, 1),
+        (2, 'Крёстный отец', 1972, 1),
+        (3, 'Мастер и Маргарита', 1967, 2),
+    ],
+    'review.csv': [
+        ('id', 'title_id', 'text', 'author_id', 'score', 'pub_date'),
+        (1, 1, 'Десять звёзд', 100, 10, '2019-09-24T21:08:21.567Z'),
+        (2, 1, 'Хорошо', 101, 7, '2019-09-24T21:08:21.567Z'),
+        (3, 1, 'Неплохо', 102, 8, '2019-09-24T21:08:21.567Z'),
+        (4, 2, 'Скучно', 100, 5, '2019-09-24T21:08:21.567Z'),
+    ],
+    'comments.csv': [
+        ('id', 'review_id', 'text', 'author_id', 'pub_date'),
+        (1, 1, 'Согласен', 101, '2019-09-24T21:08:21.567Z'),
+        (2, 4, 'Не согласен', 102, '2019-09-24T21:08:21.567Z'),
+    ],
+    'genre_title.csv': [
+        ('id', 'title_id', 'genre_id'),
+        (1, 1, 1),
+        (2, 2, 1),
+        (3, 3, 2),
+    ],
+}
+
+
+def write_csv(path, data):
+    for name, rows in data.items():
+        with open(path / name, 'w', encoding='utf-8', newline='') as file:
+            csv.writer(file).writerows(rows)
+
+
+def changes(model):
+    return list(Change.objects.filter(model=model).values_list(
+        'object_id', 'action'
+    ))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21LoadData:
+
+    def test_01_load(self, tmp_path):
+        write_csv(tmp_path, DATA)
+        call_command('load_data', path=str(tmp_path), batch_size=2)
+        for model, name in ((User, 'users.csv'), (Genre, 'genre.csv'),
+                            (Title, 'titles.csv'), (Review, 'review.csv'),
+                            (Comment, 'comments.csv'),
+                            (Title.genre.through, 'genre_title.csv')):
+            assert model.objects.count() == len(DATA[name]) - 1, (
+                f'Проверьте, что `load_data` загружает все строки `{name}` '
+                'при размере пачки меньше числа строк.'
+            )
+        assert list(Title.objects.order_by('pk').values_list(
+            'pk', 'score_sum', 'review_count', 'rating'
+        )) == [(1, 25, 3, 8), (2, 5, 1, 5), (3, 0, 0, None)], (
+            'Проверьте, что после загрузки рейтинг произведений '
+            'пересчитывается по отзывам.'
+        )
+
+    def test_02_change_log(self, tmp_path, monkeypatch):
+        in_transaction = []
+        bulk_create = ChangeQuerySet.bulk_create
+
+        def logged_bulk_create(self, objs, *args, **kwargs):
+            in_transaction.append(transaction.get_connection().in_atomic_block)
+            return bulk_create(self, objs, *args, **kwargs)
+
+        monkeypatch.setattr(ChangeQuerySet, 'bulk_create', logged_bulk_create)
+        write_csv(tmp_path, DATA)
+        call_command('load_data', path=str(tmp_path), batch_size=2)
+        assert in_transaction and all(in_transaction), (
+            'Проверьте, что `load_data` пишет журнал изменений в транзакции '
+            'загрузки файла.'
+        )
+        assert changes('title') == [(1, 'created'), (2, 'created'),
+                                    (3, 'created')], (
+            'Проверьте, что `load_data` пишет в журнал изменений '
+            'загруженные произведения.'
+        )
+        assert len(changes('review')) == 4
+        assert len(changes('comment')) == 2
+        assert not Change.objects.exclude(
+            model__in=['title', 'review', 'comment']
+        ).exists()
+
+        Change.objects.all().delete()
+        data = dict(DATA, **{'titles.csv': DATA['titles.csv'] + [
+            (4, 'Собачье сердце', 1925, 2)
+        ]})
+        data['titles.csv'][1] = (1, 'Побег из Шоушенка', 1995, 1)
+        write_csv(tmp_path, data)
+        call_command('load_data', path=str(tmp_path), batch_size=2,
+                     upsert=True)
+        assert changes('title') == [(1, 'updated'), (4, 'created')], (
+            'Проверьте, что `load_data --upsert` пишет в журнал изменений '
+            'вставленные и обновлённые произведения.'
+        )
+        assert changes('review') == []
+
+        Change.objects.all().delete()
+        data['titles.csv'] = data['titles.csv'] + [
+            (5, 'Без категории', 2000, 99)
+        ]
+        write_csv(tmp_path, data)
+        with pytest.raises(IntegrityError):
+            call_command('load_data', path=str(tmp_path), batch_size=2,
+                         upsert=True)
+        assert not Change.objects.exists(), (
+            'Проверьте, что записи журнала изменений пишутся в транзакции '
+            'загрузки файла и откатываются вместе с ней.'
+        )
+
+    def test_03_upsert_prune(self, tmp_path):
+        write_csv(tmp_path, DATA)
+        call_command('load_data', path=str(tmp_path), batch_size=2)
+        data = dict(DATA, **{
+            'titles.csv': list(DATA['titles.csv']),
+            'review.csv': DATA['review.csv'][:-1],
+            'comments.csv': DATA['comments.csv'][:-1],
+        })
+        data['titles.csv'][2] = (2, 'Крёстный отец', 1973, 2)
+        write_csv(tmp_path, data)
+
+        call_command('load_data', path=str(tmp_path), batch_size=2,
+                     upsert=True)
+        title = Title.objects.get(pk=2)
+        assert (title.year, title.category_id) == (1973, 2), (
+            'Проверьте, что `load_data --upsert` обновляет изменённые '
+            'строки.'
+        )
+        assert Review.objects.filter(pk=4).exists(), (
+            'Проверьте, что без `--prune` строки не удаляются.'
+        )
+
+        call_command('load_data', path=str(tmp_path), batch_size=2,
+                     upsert=True, prune=True)
+        assert not Review.objects.filter(pk=4).exists(), (
+            'Проверьте, что `load_data --upsert --prune` удаляет строки, '
+            'которых нет в файле.'
+        )
+        assert Review.objects.count() == 3
+        assert Comment.objects.count() == 1
+        assert Title.objects.filter(pk=2).values_list(
+            'review_count', 'rating'
+        ).get() == (0, None)
+
+    def test_04_prune_without_upsert(self, tmp_path):
+        with pytest.raises(CommandError, match='--upsert'):
+            call_command('load_data', path=str(tmp_path), prune=True)
+
+    @pytest.mark.parametrize('file_format', ['csv', 'ndjson'])
+    def test_05_dump_load(self, tmp_path, file_format):
+        write_csv(tmp_path, DATA)
+        call_command('load_data', path=str(tmp_path))
+
+        def snapshot():
+            return {
+                file: list(model.objects.order_by('pk').values_list(
+                    *dump_data.FIELDS[file]
+                ))
+                for file, model in zip(FILES, MODELS)
+            }
+
+        User.objects.filter(pk=100).update(
+            is_superuser=True, is_staff=True, last_login=timezone.now(),
+            password=make_password('secret'),
+        )
+        Review.objects.filter(pk=1).update(pub_date=timezone.now())
+        expected = snapshot()
+        output = tmp_path / 'dump'
+        call_command('dump_data', str(output), format=file_format,
+                     chunk_size=2)
+        Title.objects.filter(pk=1).update(name='Другое название')
+        Review.objects.filter(pk=4).delete()
+
+        call_command('load_data', path=str(output), format=file_format,
+                     batch_size=2)
+        assert snapshot() == expected, (
+            'Проверьте, что `load_data --format` загружает данные, '
+            'выгруженные `dump_data` в том же формате, вместе с датами '
+            'публикации и учётными данными пользователей.'
+        )
+        assert User.objects.get(pk=100).check_password('secret')
+
+        call_command('load_data', path=str(output), format=file_format,
+                     upsert=True)
+        assert not Change.objects.filter(action=Change.UPDATED).exists(), (
+            'Проверьте, что `load_data --upsert` не считает изменёнными '
+            'строки, совпадающие с выгрузкой.'
+        )
+        assert Title.objects.get(pk=1).rating == 8
+
+    def test_06_dump_snapshot(self, tmp_path, monkeypatch):
+        in_transaction = []
+
+        def export(*args):
+            in_transaction.append(transaction.get_connection().in_atomic_block)
+            return 0
+
+        monkeypatch.setattr(dump_data, 'export', export)
+        call_command('dump_data', str(tmp_path))
+        assert in_transaction == [True] * len(FILES), (
+            'Проверьте, что `dump_data` читает все таблицы в одной '
+            'транзакции.'
+        )
+
+    def test_07_reload_logs_deletes(self, tmp_path):
+        write_csv(tmp_path, DATA)
+        call_command('load_data', path=str(tmp_path), batch_size=2)
+        Change.objects.all().delete()
+
+        call_command('load_data', path=str(tmp_path), batch_size=2)
+        for model, file in (('title', 'titles.csv'), ('review', 'review.csv'),
+                            ('comment', 'comments.csv')):
+            ids = [row[0] for row in DATA[file][1:]]
+            assert changes(model) == [(pk, 'deleted') for pk in ids] + [
+                (pk, 'created') for pk in ids
+            ], (
+                'Проверьте, что при перезагрузке `load_data` пишет '
+                'в журнал изменений удалённые и загруженные строки.'
+            )
+        assert sorted(Tombstone.objects.values_list(
+            'model', 'object_id'
+        )) == sorted(
+            (model, row[0])
+            for model, file in (('title', 'titles.csv'),
+                                ('review', 'review.csv'),
+                                ('comment', 'comments.csv'),
+                                ('genre', 'genre.csv'),
+                                ('category', 'category.csv'))
+            for row in DATA[file][1:]
+        ), 'Проверьте, что при перезагрузке остаются надгробия.'
+        assert Title.objects.get(pk=1).rating == 8
+
+    def test_08_cache_invalidation(self, tmp_path, client):
+        write_csv(tmp_path, DATA)
+        call_command('load_data', path=str(tmp_path))
+        url = '/api/v1/titles/1/'
+        assert client.get(url).json()['name'] == 'Побег из Шоушенка'
+        cache.set('unrelated', 'value')
+        cache.set(snapshot_key(101), {'id': 101, 'role': 'moderator'})
+
+        data = dict(DATA, **{'titles.csv': list(DATA['titles.csv'])})
+        data['titles.csv'][1] = (1, 'Зелёная миля', 1999, 1)
+        write_csv(tmp_path, data)
+        call_command('load_data', path=str(tmp_path), upsert=True)
+        assert client.get(url).json()['name'] == 'Зелёная миля', (
+            'Проверьте, что после загрузки кэш ответов по загруженным '
+            'моделям сбрасывается.'
+        )
+        assert cache.get(snapshot_key(101)) is None, (
+            'Проверьте, что после загрузки сбрасываются снимки '
+            'пользователей для JWT.'
+        )
+        assert cache.get('unrelated') == 'value', (
+            'Проверьте, что `load_data` не очищает весь кэш.'
+        )
+
+
+def test_dependency_levels():
+    assert dependency_levels(MODELS) == [
+        [User, Category, Genre], [Title], [Review, Title.genre.through],
+        [Comment],
+    ], (
+        'Проверьте, что модели раскладываются по уровням так, что каждая '
+        'загружается после моделей, на которые ссылается.'
+    )
+    assert dependency_levels([Comment, Review, Title]) == [
+        [Title], [Review], [Comment]
+    ]
@@ -1,5 +1,7 @@
 from http import HTTPStatus
 
+from reviews.models import Category, Comment, Genre, Review, Title
+
 
 check_name_and_slug_patterns = (
     (
@@ -305,3 +307,32 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f'данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не '
         'найдено или не является целым числом.'
     )
+
+
+def create_catalog(django_user_model, reviews_count=3, comments_count=1):
+    category = Category.objects.create(name='Фильм', slug='films')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Терминатор', year=1984,
+                                 category=category)
+    title.genre.add(genre)
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'author{idx}',
+                          email=f'author{idx}@yamdb.fake')
+        for idx in range(max(reviews_count, comments_count))
+    )
+    authors = list(
+        django_user_model.objects.filter(username__startswith='author')
+    )
+    Review.objects.bulk_create(
+        Review(title=title, author=authors[idx], text=f'review {idx}',
+               score=5)
+        for idx in range(reviews_count)
+    )
+    Title.objects.recalculate_ratings()
+    reviews = list(Review.objects.filter(title=title).order_by('id'))
+    Comment.objects.bulk_create(
+        Comment(review=review, author=authors[number],
+                text=f'comment {number}')
+        for review in reviews for number in range(comments_count)
+    )
+    return title, reviews